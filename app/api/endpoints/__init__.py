@@ -1,4 +1,6 @@
 from .charity_project import router as charity_project # noqa
 from .donation import router as donation # noqa
 from .user import router as user # noqa
-from .google_spreadsheets import router as google # noqa
\ No newline at end of file
+from .google_spreadsheets import router as google # noqa
+from .open_pool import router as open_pool # noqa
+from .changes import router as changes # noqa
\ No newline at end of file
@@ -0,0 +1,70 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import MAX_PAGE_SIZE
+from app.crud.charity_project import charity_project_crud
+from app.crud.donation import donation_crud
+from app.api.pagination import decode_change_cursor, encode_change_cursor
+from app.api.responses import trusted_dict
+from app.core.db import get_async_session
+from app.core.order_book import order_book
+from app.core.user import current_superuser
+from app.schemas.changes import ChangesRead
+from app.schemas.charity_project import CharityProjectsRead
+from app.schemas.donation import SuperUserDonationRead
+
+FEEDS = (
+    ('charity_projects', charity_project_crud, CharityProjectsRead),
+    ('donations', donation_crud, SuperUserDonationRead),
+)
+
+router = APIRouter()
+
+
+@router.get(
+    '/',
+    response_model=ChangesRead,
+    dependencies=(Depends(current_superuser),),
+)
+async def get_changes(
+    since: Optional[str] = Query(
+        None, description='Курсор next_cursor из предыдущего ответа'
+    ),
+    limit: int = Query(
+        MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE,
+        description='Наибольшее число записей каждого типа'
+    ),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Только для суперюзеров.
+
+    Проекты и пожертвования, созданные или изменённые после курсора,
+    включая изменения при распределении средств. Без курсора лента
+    начинается с начала. Запись, изменённая несколько раз,
+    возвращается один раз в последнем состоянии.
+    Удаления в ленту не попадают.
+    """
+
+    await order_book.flush(session)
+    positions = decode_change_cursor(since) if since is not None else {}
+    changes = {'has_more': False}
+
+    for name, crud, schema in FEEDS:
+        rows = await crud.read_changes(
+            session, schema, positions.get(name), limit
+        )
+        fields = list(schema.__fields__)
+        changes[name] = [trusted_dict(row, fields) for row in rows]
+
+        if rows:
+            positions[name] = (rows[-1].change_seq, rows[-1].id)
+        if len(rows) == limit:
+            changes['has_more'] = True
+
+    changes['next_cursor'] = encode_change_cursor(positions)
+
+    return ORJSONResponse(changes)
@@ -1,18 +1,35 @@
-from fastapi import APIRouter, Depends
+from functools import partial
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from pydantic import conlist
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.constants import MAX_PROJECTS_BATCH_SIZE
 from app.crud.charity_project import charity_project_crud
+from app.crud.data_version import PROJECTS_VERSION_KEY, data_version_crud
 from app.crud.donation import donation_crud
+from app.crud.investment import investment_crud
 from app.schemas.charity_project import (
     CharityProjectsRead, CharityProjectsCreate, CharityProjectsUpdate
 )
-from app.core.db import get_async_session
+from app.schemas.investment import InvestmentRead
+from app.api.pagination import PageParams
+from app.api.responses import not_modified, trusted_response
+from app.api.streaming import StreamFormat, streaming_response
+from app.core.db import get_async_session, get_read_session
+from app.core.order_book import order_book
+from app.core.project_names import project_name_index
+from app.core.read_your_writes import mark_write
+from app.core.response_cache import project_list_cache
 from app.core.user import current_superuser
 from app.api.validators import (
-    project_exist, project_name_exist, project_with_donations,
+    ProjectLoader, check_no_investments, get_project_loader,
+    project_name_unique,
+    project_exist, project_name_exist, project_names_exist,
+    project_still_editable, project_with_donations,
     full_amount_lower_then_invested, ensure_project_open
 )
-from app.models import Donation
 
 router = APIRouter()
 
@@ -23,21 +40,99 @@ router = APIRouter()
     response_model_exclude_none=True,
 )
 async def get_all_projects(
+    request: Request,
+    page: PageParams = Depends(),
+    stream: Optional[StreamFormat] = Query(
+        None, description='Потоковая выгрузка: ndjson или json'
+    ),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Возвращает список всех проектов.
+
+    С параметром limit список отдаётся страницами, курсор следующей
+    страницы передаётся в заголовке X-Next-Cursor.
+    С параметром stream список выгружается потоком по мере чтения.
+    Готовые ответы кэшируются до следующего изменения проектов.
+    Ответ содержит ETag, на If-None-Match с ним возвращается 304.
+    """
+
+    if stream is not None:
+        return streaming_response(
+            charity_project_crud.stream_rows(
+                session, CharityProjectsRead, **page.filters()
+            ),
+            stream
+        )
+
+    etag = await data_version_crud.etag(PROJECTS_VERSION_KEY, session)
+    not_modified_response = not_modified(request, etag)
+    if not_modified_response is not None:
+        return not_modified_response
+
+    cache_key = project_list_cache.key(etag, str(request.query_params))
+    projects_response = project_list_cache.get(cache_key)
+
+    if projects_response is None:
+        projects = await charity_project_crud.read_rows(
+            session, CharityProjectsRead, **page.filters()
+        )
+        projects_response = trusted_response(projects, CharityProjectsRead)
+        page.set_next_cursor(projects_response, projects)
+        project_list_cache.put(cache_key, projects_response)
+
+    projects_response.headers['ETag'] = etag
+
+    return projects_response
+
+
+@router.get(
+    '/order_book',
+    response_model=list[str],
+    dependencies=(Depends(current_superuser),),
+)
+async def check_order_book(
     session: AsyncSession = Depends(get_async_session)
 ):
-    """Возвращает список всех проектов."""
+    """
+    Только для суперюзеров.
 
-    return await charity_project_crud.read_all(session)
+    Сверка книги заявок с таблицами, возвращает список расхождений.
+    """
+
+    return await order_book.check_consistency(session)
+
+
+@router.get(
+    '/{project_id}/investments',
+    response_model=list[InvestmentRead],
+    dependencies=(Depends(current_superuser),),
+)
+async def get_project_investments(
+    project_id: int,
+    loader: ProjectLoader = Depends(get_project_loader),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Только для суперюзеров.
+
+    Из каких пожертвований профинансирован проект.
+    """
+
+    await project_exist(project_id, loader)
+
+    return await investment_crud.get_project_investments(project_id, session)
 
 
 @router.post(
     '/',
     response_model=CharityProjectsRead,
     response_model_exclude_none=True,
-    dependencies=(Depends(current_superuser),),
+    dependencies=(Depends(current_superuser), Depends(mark_write)),
 )
 async def create_new_charity_projects(
     charity_project: CharityProjectsCreate,
+    loader: ProjectLoader = Depends(get_project_loader),
     session: AsyncSession = Depends(get_async_session)
 ):
     """
@@ -46,31 +141,65 @@ async def create_new_charity_projects(
     Создаёт благотворительный проект.
     """
 
-    await project_name_exist(charity_project.name, session)
+    await project_name_exist(charity_project.name, loader)
+
+    async with project_name_unique(session):
+        new_charity_project = await charity_project_crud.create(
+            charity_project, session, commit=False
+        )
+        new_charity_project = await donation_crud.invest(
+            new_charity_project, session
+        )
+    project_name_index.add(new_charity_project.name)
+
+    return new_charity_project
 
-    new_charity_project = await charity_project_crud.create(
-        charity_project, session
-    )
-    new_donate = await donation_crud.get_invested_charity_projects(
-        Donation, session
-    )
 
-    await donation_crud.distribution_of_resources(
-        new_donate, new_charity_project, session
+@router.post(
+    '/bulk',
+    response_model=list[CharityProjectsRead],
+    response_model_exclude_none=True,
+    dependencies=(Depends(current_superuser), Depends(mark_write)),
+)
+async def create_charity_projects_bulk(
+    charity_projects: conlist(
+        CharityProjectsCreate, min_items=1, max_items=MAX_PROJECTS_BATCH_SIZE
+    ),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Только для суперюзеров.
+
+    Пакетное создание проектов.
+    Имена проверяются на уникальность одним запросом, проекты
+    вставляются порциями и фиксируются одной транзакцией,
+    ожидающие пожертвования сразу распределяются по ним.
+    Ответ собирается из записанных объектов без повторной валидации.
+    """
+
+    await project_names_exist(
+        [charity_project.name for charity_project in charity_projects],
+        session
     )
 
-    return new_charity_project
+    async with project_name_unique(session):
+        new_charity_projects = await charity_project_crud.create_batch(
+            charity_projects, session
+        )
+
+    return trusted_response(new_charity_projects, CharityProjectsRead)
 
 
 @router.patch(
     '/{project_id}',
     response_model=CharityProjectsRead,
     response_model_exclude_none=True,
-    dependencies=(Depends(current_superuser),),
+    dependencies=(Depends(current_superuser), Depends(mark_write)),
 )
 async def update_charity_project(
     project_id: int,
     new_data: CharityProjectsUpdate,
+    loader: ProjectLoader = Depends(get_project_loader),
     session: AsyncSession = Depends(get_async_session)
 ):
     """
@@ -79,27 +208,33 @@ async def update_charity_project(
     Обновление данных в проекте.
     Закрытый проект нельзя.
     Нельзя установить требуемую сумму меньше уже вложенной.
+    Ожидающие пожертвования сразу довкладываются в проект.
+    Проект и занятость нового имени читаются одним запросом.
+    Проверки открытости и суммы повторяются в задаче распределения
+    по перечитанному проекту.
     """
 
-    charity_project = await project_exist(project_id, session)
-    await ensure_project_open(project_id, session)
+    await loader.load(project_id, new_data.name)
+    charity_project = await project_exist(project_id, loader)
+    await ensure_project_open(project_id, loader)
 
     if new_data.name:
-        await project_name_exist(new_data.name, session)
+        await project_name_exist(new_data.name, loader)
 
     if new_data.full_amount:
         await full_amount_lower_then_invested(
-            project_id, new_data.full_amount, session
+            project_id, new_data.full_amount, loader
         )
 
-    if charity_project.invested_amount >= charity_project.full_amount:
-        charity_project.fully_invested = True
-        await session.commit()
-        await session.refresh(charity_project)
-
-    charity_project = await charity_project_crud.update(
-        charity_project, new_data, session
-    )
+    old_name = charity_project.name
+    async with project_name_unique(session):
+        charity_project = await donation_crud.reinvest(
+            charity_project,
+            new_data,
+            session,
+            check=partial(project_still_editable, new_data)
+        )
+    project_name_index.rename(old_name, charity_project.name)
 
     return charity_project
 
@@ -107,10 +242,11 @@ async def update_charity_project(
 @router.delete(
     '/{project_id}',
     response_model=CharityProjectsRead,
-    dependencies=(Depends(current_superuser),),
+    dependencies=(Depends(current_superuser), Depends(mark_write)),
 )
 async def delete_charity_project(
     project_id: int,
+    loader: ProjectLoader = Depends(get_project_loader),
     session: AsyncSession = Depends(get_async_session)
 ):
     """
@@ -121,11 +257,12 @@ async def delete_charity_project(
     его можно только закрыть.
     """
 
-    charity_project = await project_exist(project_id, session)
+    charity_project = await project_exist(project_id, loader)
     await project_with_donations(charity_project)
 
-    charity_project = await charity_project_crud.delete(
-        charity_project, session
+    charity_project = await donation_crud.delete_project(
+        charity_project, session, check=check_no_investments
     )
+    project_name_index.discard(charity_project.name)
 
     return charity_project
\ No newline at end of file
@@ -1,13 +1,28 @@
-from fastapi import APIRouter, Depends
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from pydantic import conlist
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.constants import MAX_DONATIONS_BATCH_SIZE
+from app.crud.data_version import data_version_crud, user_donations_key
 from app.crud.donation import donation_crud
-from app.core.db import get_async_session
+from app.crud.investment import investment_crud
+from app.api.pagination import PageParams
+from app.api.responses import not_modified, trusted_response
+from app.api.streaming import StreamFormat, streaming_response
+from app.core.config import settings
+from app.core.db import get_async_session, get_read_session
+from app.core.deferred_allocation import deferred_allocation
+from app.core.read_your_writes import mark_write
 from app.core.user import current_superuser, current_user
+from app.api.validators import donation_exist_for_user
 from app.schemas.donation import (
-    DonationCreate, UserDonationsRead, SuperUserDonationRead
+    DonationCreate, DonationStatus, UserDonationsRead, SuperUserDonationRead
 )
-from app.models import User, CharityProject
+from app.schemas.investment import InvestmentRead
+from app.models import User
 
 router = APIRouter()
 
@@ -19,15 +34,36 @@ router = APIRouter()
     dependencies=(Depends(current_superuser),)
 )
 async def get_all_donations(
-    session: AsyncSession = Depends(get_async_session)
+    page: PageParams = Depends(),
+    stream: Optional[StreamFormat] = Query(
+        None, description='Потоковая выгрузка: ndjson или json'
+    ),
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Только для суперюзеров.
 
     Возвращает список всех пожертвований.
+    С параметром limit список отдаётся страницами, курсор следующей
+    страницы передаётся в заголовке X-Next-Cursor.
+    С параметром stream список выгружается потоком по мере чтения.
     """
 
-    return await donation_crud.read_all(session)
+    if stream is not None:
+        return streaming_response(
+            donation_crud.stream_rows(
+                session, SuperUserDonationRead, **page.filters()
+            ),
+            stream
+        )
+
+    donations = await donation_crud.read_rows(
+        session, SuperUserDonationRead, **page.filters()
+    )
+    donations_response = trusted_response(donations, SuperUserDonationRead)
+    page.set_next_cursor(donations_response, donations)
+
+    return donations_response
 
 
 @router.get(
@@ -36,33 +72,109 @@ async def get_all_donations(
     response_model_exclude_none=True,
 )
 async def get_my_donations(
+    request: Request,
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Вернуть список пожертвований пользователя, выполняющего запрос.
+
+    Ответ содержит ETag, на If-None-Match с ним возвращается 304.
+    """
+
+    etag = await data_version_crud.etag(user_donations_key(user.id), session)
+    not_modified_response = not_modified(request, etag)
+    if not_modified_response is not None:
+        return not_modified_response
+
+    donations = await donation_crud.get_user_donations(
+        user.id, session, UserDonationsRead
+    )
+    donations_response = trusted_response(donations, UserDonationsRead)
+    donations_response.headers['ETag'] = etag
+
+    return donations_response
+
+
+@router.get(
+    '/my/investments',
+    response_model=list[InvestmentRead],
+)
+async def get_my_investments(
+    user: User = Depends(current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Куда распределены пожертвования пользователя, выполняющего запрос."""
+
+    return await investment_crud.get_user_investments(user.id, session)
+
+
+@router.get(
+    '/{donation_id}/status',
+    response_model=DonationStatus,
+)
+async def get_donation_status(
+    donation_id: int,
     user: User = Depends(current_user),
     session: AsyncSession = Depends(get_async_session)
 ):
-    """Вернуть список пожертвований пользователя, выполняющего запрос."""
+    """Статус распределения пожертвования."""
 
-    return await donation_crud.get_user_donations(user.id, session)
+    return await donation_exist_for_user(donation_id, user, session)
 
 
 @router.post(
     '/',
     response_model=UserDonationsRead,
-    response_model_exclude_none=True
+    response_model_exclude_none=True,
+    dependencies=(Depends(mark_write),),
 )
 async def create_donation(
     donation: DonationCreate,
+    response: Response,
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_user)
 ):
-    """Создание пожертвования."""
+    """
+    Создание пожертвования.
 
-    new_donation = await donation_crud.create(donation, session, user)
-    open_charity_project = await donation_crud.get_invested_charity_projects(
-        CharityProject, session
-    )
+    В режиме отложенного распределения пожертвование только
+    сохраняется, ответ - 202, распределение выполняет фоновый проход.
+    """
 
-    await donation_crud.distribution_of_resources(
-        open_charity_project, new_donation, session
+    new_donation = await donation_crud.create(
+        donation, session, user, commit=False
     )
 
-    return new_donation
+    if settings.deferred_allocation and (
+        settings.allocation_engine != 'memory'
+    ):
+        new_donation = await donation_crud.defer(new_donation, session)
+        deferred_allocation.notify()
+        response.status_code = HTTPStatus.ACCEPTED
+        return new_donation
+
+    return await donation_crud.invest(new_donation, session)
+
+
+@router.post(
+    '/batch',
+    response_model=list[UserDonationsRead],
+    response_model_exclude_none=True,
+    dependencies=(Depends(mark_write),),
+)
+async def create_donations_batch(
+    donations: conlist(
+        DonationCreate, min_items=1, max_items=MAX_DONATIONS_BATCH_SIZE
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user)
+):
+    """
+    Пакетное создание пожертвований.
+
+    Все пожертвования пакета распределяются за один проход
+    и сохраняются одной транзакцией.
+    """
+
+    return await donation_crud.create_batch(donations, session, user)
@@ -2,7 +2,7 @@ from aiogoogle import Aiogoogle
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_async_session
+from app.core.db import get_read_session
 from app.core.google_client import get_service
 from app.core.user import current_superuser
 
@@ -21,7 +21,7 @@ router = APIRouter()
     dependencies=(Depends(current_superuser),)
 )
 async def get_spreadsheet(
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_read_session),
     wrapper_services: Aiogoogle = Depends(get_service)
 ):
     """
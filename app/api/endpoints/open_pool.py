@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import get_async_session
+from app.core.order_book import order_book
+from app.core.user import current_superuser
+from app.crud.open_pool import open_pool_crud
+from app.schemas.open_pool import OpenPoolRead
+
+router = APIRouter()
+
+
+@router.get(
+    '/',
+    response_model=OpenPoolRead,
+    dependencies=(Depends(current_superuser),),
+)
+async def get_open_pool(
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Только для суперюзеров.
+
+    Число и сумма остатков открытых проектов и пожертвований.
+    Запрос ничего не записывает: в режиме memory итоги считаются
+    по книге заявок, без строки итогов - по таблицам.
+    """
+
+    if order_book.loaded:
+        return order_book.open_totals()
+
+    open_pool = await open_pool_crud.get(session)
+
+    if open_pool is None:
+        return await open_pool_crud.calculate(session)
+
+    return open_pool
@@ -0,0 +1,98 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from http import HTTPStatus
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Query, Response
+
+from app.constants import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+
+
+def encode_cursor(create_date: datetime, record_id: int) -> str:
+    """Курсор страницы по ключу (create_date, id)."""
+
+    return base64.urlsafe_b64encode(
+        json.dumps([create_date.isoformat(), record_id]).encode()
+    ).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Ключ (create_date, id) из курсора."""
+
+    try:
+        create_date, record_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(create_date), int(record_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="Некорректный курсор страницы."
+        )
+
+
+def encode_change_cursor(positions: dict[str, tuple[int, int]]) -> str:
+    """Курсор ленты изменений: позиция (change_seq, id) каждой таблицы."""
+
+    return base64.urlsafe_b64encode(json.dumps(positions).encode()).decode()
+
+
+def decode_change_cursor(cursor: str) -> dict[str, tuple[int, int]]:
+    """Позиции таблиц из курсора ленты изменений."""
+
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(cursor))
+        return {
+            name: (int(change_seq), int(record_id))
+            for name, (change_seq, record_id) in positions.items()
+        }
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="Некорректный курсор страницы."
+        )
+
+
+@dataclass
+class PageParams:
+    """
+    Параметры страницы и фильтры списка проектов или пожертвований.
+
+    Без параметров список возвращается целиком, как раньше.
+    """
+
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_PAGE_SIZE, description='Размер страницы'
+    )
+    after: Optional[str] = Query(
+        None, description=f'Курсор из заголовка {NEXT_CURSOR_HEADER}'
+    )
+    fully_invested: Optional[bool] = Query(None)
+    created_from: Optional[datetime] = Query(None)
+    created_to: Optional[datetime] = Query(None)
+    min_amount: Optional[int] = Query(None, ge=0)
+    max_amount: Optional[int] = Query(None, ge=0)
+
+    def filters(self) -> dict:
+        """Заданные параметры как аргументы CRUD.read_rows."""
+
+        filters = {
+            name: value for name, value in vars(self).items()
+            if value is not None
+        }
+        if self.after is not None:
+            filters['after'] = decode_cursor(self.after)
+        return filters
+
+    def set_next_cursor(
+        self,
+        response: Response,
+        records: Sequence
+    ) -> None:
+        """Курсор следующей страницы, если текущая заполнена целиком."""
+
+        if self.limit is not None and len(records) == self.limit:
+            last = records[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                last.create_date, last.id
+            )
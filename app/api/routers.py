@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import charity_project, donation, user, google
+from app.api.endpoints import (
+    changes, charity_project, donation, user, google, open_pool
+)
 
 main_router = APIRouter()
 
@@ -19,4 +21,14 @@ main_router.include_router(
     prefix='/google',
     tags=('Google',)
 )
+main_router.include_router(
+    open_pool,
+    prefix='/open_pool',
+    tags=('Open pool',)
+)
+main_router.include_router(
+    changes,
+    prefix='/changes',
+    tags=('Changes',)
+)
 main_router.include_router(user)
@@ -0,0 +1,49 @@
+from typing import AsyncIterator, Literal
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+StreamFormat = Literal['ndjson', 'json']
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def encode_row(row: dict) -> bytes:
+    """JSON строки без пустых полей, как при response_model_exclude_none."""
+
+    return orjson.dumps(
+        {key: value for key, value in row.items() if value is not None}
+    )
+
+
+async def encode_rows(
+    rows: AsyncIterator[dict],
+    stream_format: StreamFormat
+) -> AsyncIterator[bytes]:
+    """Кодирование строк по мере чтения: NDJSON или JSON-массив."""
+
+    if stream_format == 'ndjson':
+        async for row in rows:
+            yield encode_row(row) + b'\n'
+        return
+
+    separator = b'['
+    async for row in rows:
+        yield separator + encode_row(row)
+        separator = b','
+    yield b'[]' if separator == b'[' else b']'
+
+
+def streaming_response(
+    rows: AsyncIterator[dict],
+    stream_format: StreamFormat
+) -> StreamingResponse:
+    """Потоковый ответ со строками списка."""
+
+    return StreamingResponse(
+        encode_rows(rows, stream_format),
+        media_type=MEDIA_TYPES[stream_format],
+    )
@@ -1,38 +1,154 @@
+from contextlib import asynccontextmanager
 from http import HTTPStatus
+from typing import AsyncIterator, Optional
 
-from fastapi import HTTPException
+from fastapi import Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.db import get_async_session
+from app.core.project_names import project_name_index
 from app.crud.charity_project import charity_project_crud
-from app.models.charity_project import CharityProject
+from app.crud.donation import donation_crud
+from app.models import CharityProject, Donation, User
+from app.schemas.charity_project import CharityProjectsUpdate
+
+PROJECT_NAME_EXISTS = "Проект с таким именем уже существует!"
+
+
+class ProjectLoader:
+    """
+    Загрузчик проектов в пределах одного запроса.
+
+    Проект по id и проверка занятости имени читаются одним запросом,
+    результат запоминается, и все проверки запроса используют его
+    без повторных обращений к БД. Имя, которого нет в индексе имён,
+    считается свободным без запроса.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self._projects: dict[int, Optional[CharityProject]] = {}
+        self._names: dict[str, Optional[int]] = {}
+
+    async def load(
+            self,
+            project_id: Optional[int] = None,
+            project_name: Optional[str] = None
+    ) -> None:
+        """Загрузка ещё не прочитанных проекта и имени одним запросом."""
+
+        if project_id in self._projects:
+            project_id = None
+        if project_name in self._names:
+            project_name = None
+        if project_name is not None and not (
+            await project_name_index.might_contain(project_name, self.session)
+        ):
+            self._names[project_name] = None
+            project_name = None
+        if project_id is None and project_name is None:
+            return
+
+        projects = await charity_project_crud.get_by_id_or_name(
+            project_id, project_name, self.session
+        )
+
+        if project_id is not None:
+            self._projects[project_id] = None
+        if project_name is not None:
+            self._names[project_name] = None
+
+        for project in projects:
+            self._projects[project.id] = project
+            self._names[project.name] = project.id
+
+    async def get(self, project_id: int) -> Optional[CharityProject]:
+        """Проект по id или None."""
+
+        await self.load(project_id=project_id)
+
+        return self._projects[project_id]
+
+    async def name_taken(self, project_name: str) -> bool:
+        """Занято ли имя каким-либо проектом."""
+
+        await self.load(project_name=project_name)
+
+        return self._names[project_name] is not None
+
+
+async def get_project_loader(
+        session: AsyncSession = Depends(get_async_session)
+) -> ProjectLoader:
+    """Загрузчик проектов, общий для всех зависимостей запроса."""
+
+    return ProjectLoader(session)
+
+
+async def project_names_exist(
+        project_names: list[str],
+        session: AsyncSession
+) -> None:
+    """
+    Проверка уникальности названий пакета проектов.
+
+    Повторы внутри пакета находятся в памяти, по БД проверяются
+    одним запросом только имена, которые есть в индексе имён.
+    """
+
+    candidates = [
+        name for name in project_names
+        if await project_name_index.might_contain(name, session)
+    ]
+
+    if len(set(project_names)) < len(project_names) or (
+        await charity_project_crud.get_taken_names(candidates, session)
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=PROJECT_NAME_EXISTS
+        )
 
 
 async def project_name_exist(
         project_name: str,
-        session: AsyncSession
+        loader: ProjectLoader
 ) -> None:
     """Проверка уникальности названия проекта."""
 
-    project_id: int | None = await charity_project_crud.get_project_id_by_name(
-        project_name, session
-    )
+    if await loader.name_taken(project_name):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=PROJECT_NAME_EXISTS
+        )
+
+
+@asynccontextmanager
+async def project_name_unique(session: AsyncSession) -> AsyncIterator[None]:
+    """
+    Нарушение уникальности имени при записи как ответ 400.
 
-    if project_id:
+    Срабатывает, если имя заняли в обход индекса имён.
+    """
+
+    try:
+        yield
+    except IntegrityError:
+        await session.rollback()
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
-            detail="Проект с таким именем уже существует!"
+            detail=PROJECT_NAME_EXISTS
         )
 
 
 async def project_exist(
         project_id: int,
-        session: AsyncSession
+        loader: ProjectLoader
 ) -> CharityProject:
     """Проверка существования проекта."""
 
-    charity_project: CharityProject = await charity_project_crud.read(
-        project_id, session
-    )
+    charity_project: CharityProject = await loader.get(project_id)
 
     if not charity_project:
         raise HTTPException(
@@ -43,10 +159,28 @@ async def project_exist(
     return charity_project
 
 
-async def project_with_donations(
-        charity_project: CharityProject
-) -> CharityProject:
-    """Проверка на удаление проекта, который начал сбор средств."""
+async def donation_exist_for_user(
+        donation_id: int,
+        user: User,
+        session: AsyncSession
+) -> Donation:
+    """Проверка существования пожертвования, доступного пользователю."""
+
+    donation: Donation = await donation_crud.read(donation_id, session)
+
+    if not donation or (
+        donation.user_id != user.id and not user.is_superuser
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail="Пожертвование не найдено."
+        )
+
+    return donation
+
+
+def check_no_investments(charity_project: CharityProject) -> None:
+    """В проект ещё не вносились средства."""
 
     if charity_project.invested_amount > 0:
         raise HTTPException(
@@ -54,19 +188,19 @@ async def project_with_donations(
             detail="В проект были внесены средства, не подлежит удалению!"
         )
 
-    return charity_project
-
 
-async def full_amount_lower_then_invested(
-        project_id: int,
-        amount: int,
-        session: AsyncSession
+async def project_with_donations(
+        charity_project: CharityProject
 ) -> CharityProject:
-    """Проверка на изменение суммы сбора средтсв."""
+    """Проверка на удаление проекта, который начал сбор средств."""
+
+    check_no_investments(charity_project)
+
+    return charity_project
+
 
-    charity_project: CharityProject = await charity_project_crud.read(
-        project_id, session
-    )
+def check_full_amount(charity_project: CharityProject, amount: int) -> None:
+    """Новая сумма сбора не меньше уже вложенной."""
 
     if charity_project.invested_amount > amount:
         raise HTTPException(
@@ -77,23 +211,54 @@ async def full_amount_lower_then_invested(
             )
         )
 
+
+def check_project_open(charity_project: CharityProject) -> None:
+    """Проект ещё не закрыт."""
+
+    if charity_project.close_date:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail="Закрытый проект нельзя редактировать!"
+        )
+
+
+def project_still_editable(
+        new_data: CharityProjectsUpdate,
+        charity_project: CharityProject
+) -> None:
+    """
+    Повтор проверок PATCH по актуальному состоянию проекта.
+
+    Вызывается в задаче распределения после перечитывания проекта:
+    пока запрос ждал очереди, проект могли закрыть или довложить.
+    """
+
+    check_project_open(charity_project)
+
+    if new_data.full_amount:
+        check_full_amount(charity_project, new_data.full_amount)
+
+
+async def full_amount_lower_then_invested(
+        project_id: int,
+        amount: int,
+        loader: ProjectLoader
+) -> CharityProject:
+    """Проверка на изменение суммы сбора средтсв."""
+
+    charity_project: CharityProject = await loader.get(project_id)
+    check_full_amount(charity_project, amount)
+
     return charity_project
 
 
 async def ensure_project_open(
         project_id: int,
-        session: AsyncSession
+        loader: ProjectLoader
 ) -> CharityProject:
     """Проверка на изменения закрытого проекта."""
 
-    charity_project: CharityProject = await charity_project_crud.read(
-        project_id, session
-    )
-
-    if charity_project.close_date:
-        raise HTTPException(
-            status_code=HTTPStatus.BAD_REQUEST,
-            detail="Закрытый проект нельзя редактировать!"
-        )
+    charity_project: CharityProject = await loader.get(project_id)
+    check_project_open(charity_project)
 
     return charity_project
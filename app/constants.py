@@ -6,6 +6,15 @@ SPREADSHEET_COLUMN_COUNT_DRAFT = 11
 MAX_LENGTH_FOR_NAME = 100
 MIN_LENGTH_FOR_NAME = 1
 DEFAULT_INVESTED_AMOUNT = 0
+OPEN_POOL_CHUNK_SIZE = 100
+MAX_DONATIONS_BATCH_SIZE = 1000
+MAX_PROJECTS_BATCH_SIZE = 50_000
+MAX_STATEMENT_PARAMETERS = 32766
+ALLOCATION_LOCK_KEY = 20240723
+OPEN_POOL_ID = 1
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+STREAM_CHUNK_SIZE = 500
 TOKEN_LIFETIME = 3600
 PASSWORD_MIN_LENGTH = 3
 GOOGLE_SHEETS_URL = 'https://docs.google.com/spreadsheets/d/'
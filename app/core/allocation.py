@@ -0,0 +1,99 @@
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+RUNNING_TOTAL_WINDOW = 64
+
+
+class Allocation(NamedTuple):
+    """Результат распределения: приращения и индексы закрытых записей."""
+
+    funds_deltas: list[int]
+    open_deltas: list[int]
+    closed_funds: list[int]
+    closed_open: list[int]
+
+
+def allocate(
+    funds_remaining: Sequence[int],
+    open_remaining: Sequence[int]
+) -> Allocation:
+    """
+    FIFO-распределение средств по открытым записям.
+
+    Принимает остатки новых средств и открытых записей в порядке
+    create_date. Всего переходит меньшая из двух сумм, каждая запись
+    получает пересечение своего отрезка нарастающего итога с этой
+    суммой. Закрыты записи, нарастающий итог которых ею покрыт.
+    Функция не зависит от ORM и сессии.
+    """
+
+    funds_total = np.cumsum(funds_remaining, dtype=np.int64)
+    open_total = _running_total(
+        np.asarray(open_remaining, dtype=np.int64),
+        funds_total[-1] if funds_total.size else 0,
+    )
+
+    transferred = min(
+        funds_total[-1] if funds_total.size else 0,
+        open_total[-1] if open_total.size else 0,
+    )
+
+    funds_deltas, closed_funds = _fill(funds_total, transferred)
+    open_deltas, closed_open = _fill(open_total, transferred)
+
+    return Allocation(funds_deltas, open_deltas, closed_funds, closed_open)
+
+
+def _running_total(remaining: np.ndarray, needed: int) -> np.ndarray:
+    """
+    Нарастающий итог начала очереди, покрывающего сумму needed.
+
+    Окно растёт геометрически, поэтому небольшая сумма
+    не требует обхода всей очереди.
+    """
+
+    window = RUNNING_TOTAL_WINDOW
+    while True:
+        running_total = np.cumsum(remaining[:window])
+        if window >= remaining.size or running_total[-1] >= needed:
+            return running_total
+        window *= 4
+
+
+def _fill(
+    running_total: np.ndarray,
+    transferred: int
+) -> tuple[list[int], list[int]]:
+    closed_count = int(
+        np.searchsorted(running_total, transferred, side='right')
+    )
+    touched_count = min(closed_count + 1, running_total.size)
+
+    touched_total = running_total[:touched_count]
+    deltas = np.diff(np.minimum(touched_total, transferred), prepend=0)
+
+    return deltas.tolist(), list(range(closed_count))
+
+
+def transfers(allocation: Allocation) -> list[tuple[int, int, int]]:
+    """
+    Переводы между записями двух сторон распределения.
+
+    Границы отрезков нарастающих итогов обеих сторон объединяются,
+    каждый отрезок между соседними границами - один перевод
+    (индекс средств, индекс открытой записи, сумма).
+    """
+
+    funds_total = np.cumsum(allocation.funds_deltas, dtype=np.int64)
+    open_total = np.cumsum(allocation.open_deltas, dtype=np.int64)
+
+    bounds = np.union1d(funds_total, open_total)
+    amounts = np.diff(bounds, prepend=0)
+    bounds, amounts = bounds[amounts > 0], amounts[amounts > 0]
+
+    return list(zip(
+        np.searchsorted(funds_total, bounds).tolist(),
+        np.searchsorted(open_total, bounds).tolist(),
+        amounts.tolist(),
+    ))
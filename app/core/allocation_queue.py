@@ -0,0 +1,74 @@
+import asyncio
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, Optional
+
+
+class AllocationQueue:
+    """
+    Очередь распределения средств с единственным исполнителем.
+
+    Задачи распределения выполняются строго по одной в порядке
+    поступления, поэтому параллельные запросы не перезаписывают
+    invested_amount по устаревшим данным.
+    """
+
+    def __init__(self) -> None:
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Запуск исполнителя в текущем цикле событий."""
+
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка исполнителя."""
+
+        if self._worker is None:
+            return
+
+        self._worker.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._worker
+
+        self._queue = None
+        self._worker = None
+
+    async def submit(self, job: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Постановка задачи в очередь и ожидание её результата.
+
+        Если исполнитель не запущен (скрипты, миграции),
+        задача выполняется сразу.
+        """
+
+        if self._worker is None:
+            return await job()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((job, future))
+
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            job, future = await self._queue.get()
+
+            if future.cancelled():
+                self._queue.task_done()
+                continue
+
+            try:
+                result = await job()
+            except Exception as error:
+                if not future.cancelled():
+                    future.set_exception(error)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+
+allocation_queue = AllocationQueue()
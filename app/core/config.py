@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import BaseSettings, EmailStr
 
 
@@ -6,6 +6,26 @@ class Settings(BaseSettings):
     app_title: str = 'Кошачий благотворительный фонд'
     app_description: str = 'Сервис для поддержки котиков!'
     database_url: str = 'sqlite+aiosqlite:///./cat_charity_found.db'
+    pool_size: int = 5
+    pool_max_overflow: int = 10
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    statement_timeout: Optional[int] = None
+    read_replica_url: Optional[str] = None
+    read_your_writes_window: float = 5.0
+    sqlite_journal_mode: Literal['WAL', 'DELETE'] = 'WAL'
+    sqlite_synchronous: Literal['OFF', 'NORMAL', 'FULL', 'EXTRA'] = 'NORMAL'
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size: int = -64 * 1024
+    sqlite_busy_timeout: int = 5000
+    sqlite_temp_store: Literal['DEFAULT', 'FILE', 'MEMORY'] = 'MEMORY'
+    allocation_engine: Literal['orm', 'sql', 'memory'] = 'orm'
+    order_book_flush_interval: float = 1.0
+    deferred_allocation: bool = False
+    deferred_allocation_window: float = 0.05
+    project_list_cache_size: int = 256
+    project_list_cache_ttl: float = 5.0
+    bulk_chunk_size: int = 1000
     secret: str = 'SECRET'
     first_superuser_email: Optional[EmailStr] = None
     first_superuser_password: Optional[str] = None
@@ -1,8 +1,14 @@
-from sqlalchemy import Column, Integer
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from fastapi import Depends, Request
+from sqlalchemy import Column, Integer, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine, AsyncSession, create_async_engine
+)
 from sqlalchemy.orm import declarative_base, declared_attr, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
+from app.core.read_your_writes import read_your_writes
 
 
 class PreBase:
@@ -14,12 +20,126 @@ class PreBase:
     id = Column(Integer, primary_key=True)
 
 
+def engine_options(database_url: str) -> dict:
+    """
+    Параметры пула соединений и драйвера для URL базы данных.
+
+    Пул настраивается для PostgreSQL (asyncpg), тайм-аут запроса
+    в миллисекундах передаётся серверу как statement_timeout.
+    Файл SQLite вместо нового соединения на каждую сессию
+    использует пул, чтобы PRAGMA профиля выполнялись один раз
+    на соединение.
+    """
+
+    url = make_url(database_url)
+
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return {}
+        return {'poolclass': AsyncAdaptedQueuePool}
+
+    if url.get_backend_name() != 'postgresql':
+        return {}
+
+    options = dict(
+        pool_size=settings.pool_size,
+        max_overflow=settings.pool_max_overflow,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+    )
+    if settings.statement_timeout is not None:
+        options['connect_args'] = {
+            'server_settings': {
+                'statement_timeout': str(settings.statement_timeout)
+            }
+        }
+
+    return options
+
+
+def sqlite_pragmas() -> dict[str, object]:
+    """PRAGMA профиля SQLite из настроек."""
+
+    return {
+        'journal_mode': settings.sqlite_journal_mode,
+        'synchronous': settings.sqlite_synchronous,
+        'mmap_size': settings.sqlite_mmap_size,
+        'cache_size': settings.sqlite_cache_size,
+        'busy_timeout': settings.sqlite_busy_timeout,
+        'temp_store': settings.sqlite_temp_store,
+    }
+
+
+def apply_sqlite_profile(engine: AsyncEngine) -> None:
+    """
+    Профиль SQLite, применяемый к каждому новому соединению.
+
+    WAL не блокирует читателей записью, synchronous=NORMAL в WAL
+    синхронизирует диск при контрольной точке, а не при каждом
+    коммите. journal_mode хранится в файле БД, остальные PRAGMA
+    действуют в пределах соединения. Для других СУБД ничего не делает.
+    """
+
+    url = engine.url
+    if url.get_backend_name() != 'sqlite':
+        return
+
+    pragmas = sqlite_pragmas()
+    if url.database in (None, '', ':memory:'):
+        pragmas.pop('journal_mode')
+
+    @event.listens_for(engine.sync_engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
 Base = declarative_base(cls=PreBase)
-engine = create_async_engine(settings.database_url)
-AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession)
+engine = create_async_engine(
+    settings.database_url, **engine_options(settings.database_url)
+)
+apply_sqlite_profile(engine)
+AsyncSessionLocal = sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
+
+read_engine = None
+ReadSessionLocal = None
+if settings.read_replica_url is not None:
+    read_engine = create_async_engine(
+        settings.read_replica_url,
+        **engine_options(settings.read_replica_url)
+    )
+    apply_sqlite_profile(read_engine)
+    ReadSessionLocal = sessionmaker(
+        read_engine, class_=AsyncSession, expire_on_commit=False
+    )
 
 
 async def get_async_session():
     async with AsyncSessionLocal() as async_session:
 
-        yield async_session
\ No newline at end of file
+        yield async_session
+
+
+async def get_read_session(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Сессия для эндпоинтов чтения.
+
+    Если задана реплика, чтение идёт в неё, иначе и для клиентов,
+    недавно выполнявших запись, - в основную БД через
+    get_async_session. Запись через эту сессию не выполняется.
+    """
+
+    if ReadSessionLocal is None or read_your_writes.is_recent(request):
+        yield session
+        return
+
+    async with ReadSessionLocal() as read_session:
+
+        yield read_session
\ No newline at end of file
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.donation import donation_crud
+
+
+class DeferredAllocation:
+    """
+    Фоновое распределение отложенных пожертвований.
+
+    После первого уведомления исполнитель ждёт окно window,
+    чтобы собрать всплеск пожертвований, и распределяет
+    все накопившиеся пожертвования одним проходом.
+    """
+
+    def __init__(self) -> None:
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        window: float,
+    ) -> None:
+        """
+        Запуск исполнителя в текущем цикле событий.
+
+        Первый проход подбирает пожертвования,
+        оставшиеся от предыдущего запуска.
+        """
+
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        self._worker = asyncio.create_task(
+            self._run(session_factory, window)
+        )
+
+    async def stop(self) -> None:
+        """Остановка исполнителя."""
+
+        if self._worker is None:
+            return
+
+        self._worker.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._worker
+
+        self._wakeup = None
+        self._worker = None
+
+    def notify(self) -> None:
+        """Уведомление о новом отложенном пожертвовании."""
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        window: float,
+    ) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(window)
+            self._wakeup.clear()
+
+            try:
+                async with session_factory() as session:
+                    await donation_crud.allocate_pending(session)
+            except Exception:
+                logging.exception(
+                    'Не удалось распределить отложенные пожертвования.'
+                )
+
+
+deferred_allocation = DeferredAllocation()
@@ -0,0 +1,422 @@
+import asyncio
+import logging
+from bisect import insort
+from collections import deque
+from contextlib import suppress
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Optional, Union
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import OPEN_POOL_CHUNK_SIZE
+from app.core.allocation import allocate, transfers
+from app.core.response_cache import project_list_cache
+from app.crud.base_crud import CRUD
+from app.crud.data_version import data_version_crud
+from app.crud.investment import investment_crud
+from app.crud.open_pool import open_pool_crud
+from app.models import CharityProject, Donation, Investment
+
+
+class OpenRecord:
+    """Компактная запись открытого проекта или пожертвования."""
+
+    __slots__ = (
+        'id', 'create_date', 'full_amount', 'invested_amount', 'close_date'
+    )
+
+    def __init__(
+        self,
+        id: int,
+        create_date: datetime,
+        full_amount: int,
+        invested_amount: int,
+    ) -> None:
+        self.id = id
+        self.create_date = create_date
+        self.full_amount = full_amount
+        self.invested_amount = invested_amount
+        self.close_date = None
+
+    def __lt__(self, other: 'OpenRecord') -> bool:
+        return (self.create_date, self.id) < (other.create_date, other.id)
+
+    @property
+    def remaining(self) -> int:
+        return self.full_amount - self.invested_amount
+
+
+class OrderBook:
+    """
+    Книга заявок для распределения средств в памяти.
+
+    Открытые проекты и пожертвования хранятся в двух очередях
+    в порядке create_date, распределение - арифметика над ними.
+    Изменённые записи и переводы накапливаются
+    и пакетами записываются в БД.
+    При запуске книга восстанавливается из таблиц.
+    Распределение книгой выполняется в allocation_queue,
+    записи в БД не пересекаются между собой.
+    """
+
+    models = (CharityProject, Donation)
+
+    def __init__(self) -> None:
+        self.queues: dict[type, deque[OpenRecord]] = {}
+        self.dirty: dict[type, dict[int, OpenRecord]] = {}
+        self.transfers: list[tuple[int, int, int]] = []
+        self.loaded = False
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    async def load(
+        self,
+        session: AsyncSession,
+        exclude: Optional[Union[CharityProject, Donation]] = None
+    ) -> None:
+        """
+        Построение книги по открытым записям таблиц.
+
+        Запись exclude, которую вызывающий код распределит сам,
+        в книгу не попадает. Если после сбоя открытыми остались
+        обе стороны, они сразу сводятся между собой.
+        """
+
+        queues = {}
+        for model in self.models:
+            query = select(
+                model.id,
+                model.create_date,
+                model.full_amount,
+                model.invested_amount,
+            ).where(
+                model.fully_invested.is_(False)
+            ).order_by(model.create_date, model.id)
+
+            if isinstance(exclude, model):
+                query = query.where(model.id != exclude.id)
+
+            open_rows = await session.execute(query)
+            queues[model] = deque(OpenRecord(*row) for row in open_rows)
+
+        if self.loaded:
+            return
+
+        self.queues = queues
+        self.dirty = {model: {} for model in self.models}
+        self.loaded = True
+
+        donations = self.queues[Donation]
+        while donations and self.queues[CharityProject]:
+            self._fill(donations.popleft(), Donation)
+
+    async def start(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        flush_interval: float,
+    ) -> None:
+        """Загрузка книги и запуск фоновой записи изменений."""
+
+        async with session_factory() as session:
+            await self.load(session)
+
+        self._flusher = asyncio.create_task(
+            self._run_flusher(session_factory, flush_interval)
+        )
+
+    async def stop(self, session_factory: Callable[[], AsyncSession]) -> None:
+        """Остановка фоновой записи с сохранением накопленных изменений."""
+
+        if self._flusher is not None:
+            self._flusher.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flusher
+            self._flusher = None
+
+        if self.loaded:
+            async with session_factory() as session:
+                await self.flush(session)
+
+        self.loaded = False
+        self._flush_lock = asyncio.Lock()
+
+    async def ensure_loaded(
+        self,
+        session: AsyncSession,
+        exclude: Optional[Union[CharityProject, Donation]] = None
+    ) -> None:
+        """Загрузка книги при первом обращении."""
+
+        if not self.loaded:
+            await self.load(session, exclude)
+
+    def invest(
+        self,
+        funds: Union[CharityProject, Donation]
+    ) -> Union[CharityProject, Donation]:
+        """Распределение новых средств по открытым записям книги."""
+
+        record = OpenRecord(
+            funds.id, funds.create_date,
+            funds.full_amount, funds.invested_amount
+        )
+        self._fill(record, type(funds))
+
+        funds.invested_amount = record.invested_amount
+        if record.close_date is not None:
+            funds.fully_invested = True
+            funds.close_date = record.close_date
+
+        return funds
+
+    def sync(self, project_or_donation: Union[CharityProject, Donation]):
+        """
+        Перенос в книгу изменений записи, сделанных в обход неё.
+
+        Переносятся только full_amount и закрытие: invested_amount
+        ведёт книга, значение из БД может отставать от неё.
+        """
+
+        if not self.loaded:
+            return
+
+        queue = self.queues[type(project_or_donation)]
+        record = self._find(project_or_donation)
+
+        if record is None:
+            return
+
+        record.full_amount = project_or_donation.full_amount
+
+        if project_or_donation.fully_invested:
+            record.close_date = project_or_donation.close_date
+            queue.remove(record)
+
+    def discard(self, project_or_donation: Union[CharityProject, Donation]):
+        """Удаление записи из книги."""
+
+        if not self.loaded:
+            return
+
+        record = self._find(project_or_donation)
+
+        if record is not None:
+            self.queues[type(project_or_donation)].remove(record)
+
+        self.dirty[type(project_or_donation)].pop(
+            project_or_donation.id, None
+        )
+
+    def reset(self) -> None:
+        """
+        Сброс книги после изменений таблиц в обход неё.
+
+        Вызывается после flush, следующее обращение
+        загрузит книгу из таблиц заново.
+        """
+
+        self.queues = {}
+        self.dirty = {}
+        self.transfers = []
+        self.loaded = False
+
+    def open_totals(self) -> dict[str, int]:
+        """Число и сумма остатков открытых записей книги."""
+
+        totals = {}
+        for model, (count_field, remaining_field) in (
+            open_pool_crud.fields.items()
+        ):
+            queue = self.queues[model]
+            totals[count_field] = len(queue)
+            totals[remaining_field] = sum(
+                record.remaining for record in queue
+            )
+
+        return totals
+
+    async def flush(self, session: AsyncSession) -> None:
+        """
+        Пакетная запись накопленных изменений в БД.
+
+        Итоги открытой очереди после записи пересчитываются по таблицам.
+        Записи выполняются по одной, поэтому после возврата
+        все изменения, накопленные до вызова, уже зафиксированы.
+        """
+
+        async with self._flush_lock:
+            await self._flush(session)
+
+    async def _flush(self, session: AsyncSession) -> None:
+        if not self.loaded:
+            return
+
+        pending = self.dirty
+        pending_transfers = self.transfers
+        self.dirty = {model: {} for model in self.models}
+        self.transfers = []
+
+        changes = {
+            model: [
+                {
+                    'id': record.id,
+                    'invested_amount': record.invested_amount,
+                    'fully_invested': record.close_date is not None,
+                    'close_date': record.close_date,
+                }
+                for record in records.values()
+            ]
+            for model, records in pending.items()
+        }
+
+        try:
+            for model, invested_rows in changes.items():
+                await CRUD(model).bulk_update(
+                    invested_rows, session, commit=False
+                )
+
+            await investment_crud.create_transfers(pending_transfers, session)
+
+            if any(changes.values()):
+                await open_pool_crud.recalculate(session)
+                await data_version_crud.bump(
+                    data_version_crud.keys_for(), session
+                )
+
+            await session.commit()
+            project_list_cache.bump()
+        except Exception:
+            self.transfers = pending_transfers + self.transfers
+            for model, records in pending.items():
+                for record_id, record in records.items():
+                    self.dirty[model].setdefault(record_id, record)
+            raise
+
+    async def check_consistency(self, session: AsyncSession) -> list[str]:
+        """
+        Сравнение книги с таблицами, возвращает список расхождений.
+
+        Также invested_amount каждой строки сверяется
+        с суммой её переводов в журнале.
+        """
+
+        problems = []
+        if not self.loaded:
+            return problems
+
+        for model in self.models:
+            open_rows = await session.execute(
+                select(model.id, model.full_amount, model.invested_amount)
+                .where(model.fully_invested.is_(False))
+            )
+            in_db = {row.id: row for row in open_rows}
+            in_book = {record.id: record for record in self.queues[model]}
+            table_name = model.__tablename__
+
+            for record_id in in_db.keys() - in_book.keys():
+                if record_id not in self.dirty[model]:
+                    problems.append(
+                        f'{table_name} {record_id}: открыт в БД, '
+                        'но отсутствует в книге'
+                    )
+
+            for record_id in in_book.keys() - in_db.keys():
+                problems.append(
+                    f'{table_name} {record_id}: есть в книге, '
+                    'но закрыт или отсутствует в БД'
+                )
+
+            for record_id in in_book.keys() & in_db.keys():
+                record, row = in_book[record_id], in_db[record_id]
+                if record_id in self.dirty[model]:
+                    continue
+                if (
+                    record.full_amount != row.full_amount or
+                    record.invested_amount != row.invested_amount
+                ):
+                    problems.append(
+                        f'{table_name} {record_id}: в книге '
+                        f'{record.invested_amount}/{record.full_amount}, '
+                        f'в БД {row.invested_amount}/{row.full_amount}'
+                    )
+
+            key = (
+                Investment.project_id if model is CharityProject
+                else Investment.donation_id
+            )
+            transferred = func.coalesce(func.sum(Investment.amount), 0)
+            unbalanced = await session.execute(
+                select(model.id, model.invested_amount, transferred)
+                .outerjoin(Investment, key == model.id)
+                .group_by(model.id, model.invested_amount)
+                .having(model.invested_amount != transferred)
+            )
+            for record_id, invested_amount, total in unbalanced:
+                problems.append(
+                    f'{table_name} {record_id}: invested_amount '
+                    f'{invested_amount}, по журналу переводов {total}'
+                )
+
+        return problems
+
+    def _fill(self, record: OpenRecord, model: type) -> None:
+        counterpart = Donation if model is CharityProject else CharityProject
+        queue = self.queues[counterpart]
+
+        while record.remaining > 0 and queue:
+            heads = list(islice(queue, OPEN_POOL_CHUNK_SIZE))
+            allocation = allocate(
+                [record.remaining], [current.remaining for current in heads]
+            )
+            record.invested_amount += sum(allocation.funds_deltas)
+
+            for _, open_index, amount in transfers(allocation):
+                donation_id, project_id = record.id, heads[open_index].id
+                if model is CharityProject:
+                    donation_id, project_id = project_id, donation_id
+                self.transfers.append((donation_id, project_id, amount))
+
+            for current, delta in zip(heads, allocation.open_deltas):
+                current.invested_amount += delta
+                self.dirty[counterpart][current.id] = current
+
+            for _ in allocation.closed_open:
+                queue.popleft().close_date = datetime.now()
+
+        if record.remaining == 0:
+            record.close_date = datetime.now()
+        else:
+            insort(self.queues[model], record)
+
+        self.dirty[model][record.id] = record
+
+    def _find(
+        self,
+        project_or_donation: Union[CharityProject, Donation]
+    ) -> Optional[OpenRecord]:
+        for record in self.queues[type(project_or_donation)]:
+            if record.id == project_or_donation.id:
+                return record
+        return None
+
+    async def _run_flusher(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        flush_interval: float,
+    ) -> None:
+        while True:
+            await asyncio.sleep(flush_interval)
+
+            if not any(self.dirty.values()) and not self.transfers:
+                continue
+
+            try:
+                async with session_factory() as session:
+                    await self.flush(session)
+            except Exception:
+                logging.exception('Не удалось записать книгу заявок в БД.')
+
+
+order_book = OrderBook()
@@ -0,0 +1,57 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import CharityProject
+
+
+class ProjectNameIndex:
+    """
+    Множество имён проектов в памяти процесса.
+
+    Отсутствие имени в индексе означает, что имя свободно, и проверка
+    обходится без БД. Наличие имени подтверждается точным запросом,
+    так как проект мог быть переименован или удалён в обход индекса.
+    Окончательная гарантия - ограничение уникальности в БД.
+    """
+
+    def __init__(self) -> None:
+        self.names: Optional[set[str]] = None
+
+    async def ensure_loaded(self, session: AsyncSession) -> None:
+        """Загрузка имён при первом обращении."""
+
+        if self.names is not None:
+            return
+
+        names = await session.scalars(select(CharityProject.name))
+        self.names = set(names)
+
+    async def might_contain(self, name: str, session: AsyncSession) -> bool:
+        """Может ли имя быть занято; False - имя точно свободно."""
+
+        await self.ensure_loaded(session)
+
+        return name in self.names
+
+    def add(self, name: str) -> None:
+        if self.names is not None:
+            self.names.add(name)
+
+    def discard(self, name: str) -> None:
+        if self.names is not None:
+            self.names.discard(name)
+
+    def rename(self, old_name: str, new_name: str) -> None:
+        if old_name != new_name:
+            self.discard(old_name)
+            self.add(new_name)
+
+    def clear(self) -> None:
+        """Сброс индекса, следующее обращение загрузит его заново."""
+
+        self.names = None
+
+
+project_name_index = ProjectNameIndex()
@@ -0,0 +1,55 @@
+from typing import Optional
+
+from cachetools import TTLCache
+from fastapi import Request
+
+from app.core.config import settings
+
+RECENT_WRITERS_MAXSIZE = 10_000
+
+
+class ReadYourWrites:
+    """
+    Клиенты, недавно выполнявшие запись.
+
+    Клиент определяется заголовком Authorization. В течение окна
+    после начала записи его чтения идут в основную БД, чтобы он
+    видел свои изменения, даже если реплика отстаёт.
+    Учёт ведётся в памяти процесса.
+    """
+
+    def __init__(self, window: float) -> None:
+        self.window = window
+        self._recent = TTLCache(
+            maxsize=RECENT_WRITERS_MAXSIZE, ttl=window or 1
+        )
+
+    @staticmethod
+    def client_key(request: Request) -> Optional[str]:
+        return request.headers.get('authorization')
+
+    def mark(self, request: Request) -> None:
+        """Отметка записи клиента."""
+
+        key = self.client_key(request)
+        if key is not None and self.window:
+            self._recent[key] = True
+
+    def is_recent(self, request: Request) -> bool:
+        """Выполнял ли клиент запись в пределах окна."""
+
+        key = self.client_key(request)
+
+        return key is not None and key in self._recent
+
+    def clear(self) -> None:
+        self._recent.clear()
+
+
+read_your_writes = ReadYourWrites(settings.read_your_writes_window)
+
+
+async def mark_write(request: Request) -> None:
+    """Зависимость пишущих эндпоинтов: чтения клиента идут в основную БД."""
+
+    read_your_writes.mark(request)
@@ -0,0 +1,67 @@
+from typing import Hashable, Optional
+
+from cachetools import TTLCache
+from fastapi import Response
+
+from app.core.config import settings
+
+
+class ResponseCache:
+    """
+    Кэш готовых ответов в памяти процесса.
+
+    Хранятся уже сериализованные тела ответов. Ключ включает версию
+    данных, которую увеличивает каждая запись, влияющая на ответы,
+    поэтому после записи старые ответы не выдаются, а вытесняются
+    по размеру или времени жизни. Ответ, собранный до записи,
+    сохраняется под старой версией и тоже не выдаётся.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def key(self, *parts: Hashable) -> tuple:
+        """Ключ ответа для текущей версии данных."""
+
+        return (self.version, *parts)
+
+    def get(self, key: tuple) -> Optional[Response]:
+        cached = self._cache.get(key)
+
+        if cached is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        body, media_type, headers = cached
+
+        return Response(body, media_type=media_type, headers=headers)
+
+    def put(self, key: tuple, response: Response) -> None:
+        if not self.maxsize:
+            return
+
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name not in ('content-length', 'content-type')
+        }
+        self._cache[key] = (response.body, response.media_type, headers)
+
+    def bump(self) -> None:
+        """Новая версия данных после записи."""
+
+        self.version += 1
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self.hits = self.misses = 0
+
+
+project_list_cache = ResponseCache(
+    settings.project_list_cache_size, settings.project_list_cache_ttl
+)
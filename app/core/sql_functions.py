@@ -0,0 +1,30 @@
+from sqlalchemy import Float
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class days_between(FunctionElement):
+    """
+    Число дней между двумя датами, дробное.
+
+    days_between(end, start) компилируется под диалект:
+    julianday в SQLite, разница эпох в PostgreSQL.
+    """
+
+    type = Float()
+    name = 'days_between'
+    inherit_cache = True
+
+
+@compiles(days_between)
+def compile_days_between(element, compiler, **kw):
+    end, start = (compiler.process(clause, **kw) for clause in element.clauses)
+
+    return f'(julianday({end}) - julianday({start}))'
+
+
+@compiles(days_between, 'postgresql')
+def compile_days_between_postgresql(element, compiler, **kw):
+    end, start = (compiler.process(clause, **kw) for clause in element.clauses)
+
+    return f'(EXTRACT(EPOCH FROM ({end} - {start})) / 86400)'
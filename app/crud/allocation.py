@@ -0,0 +1,372 @@
+from functools import partial
+from typing import AsyncIterator, Callable, Optional, Sequence, Union
+from datetime import datetime
+
+from pydantic import BaseModel
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base_crud import CRUD
+from .data_version import data_version_crud
+from app.constants import ALLOCATION_LOCK_KEY, OPEN_POOL_CHUNK_SIZE
+from app.core.allocation import Allocation, allocate, transfers
+from app.core.allocation_queue import allocation_queue
+from app.core.config import settings
+from app.core.order_book import order_book
+from app.core.response_cache import project_list_cache
+from app.crud.investment import investment_crud
+from app.crud.open_pool import open_pool_crud
+from app.models import CharityProject, Donation, User
+
+
+class CRUDAllocation(CRUD):
+    """
+    Базовый CRUD проектов и пожертвований.
+
+    Общие шаги распределения средств и пакетные операции,
+    которые ведут итоги открытой очереди, версии данных
+    и книгу заявок.
+    """
+
+    @staticmethod
+    def counterpart(
+            funds: Union[CharityProject, Donation, type]
+    ) -> Union[type[CharityProject], type[Donation]]:
+        """
+        Модель, из открытых записей которой покрываются средства.
+
+        Принимает запись или её модель.
+        """
+
+        if funds is CharityProject or isinstance(funds, CharityProject):
+            return Donation
+        return CharityProject
+
+    async def lock_open_pool(self, session: AsyncSession) -> None:
+        """
+        Блокировка распределения средств между процессами.
+
+        В PostgreSQL берётся advisory lock до конца транзакции,
+        внутри процесса порядок обеспечивает allocation_queue.
+        """
+
+        if session.bind.dialect.name == 'postgresql':
+            await session.execute(
+                select(func.pg_advisory_xact_lock(ALLOCATION_LOCK_KEY))
+            )
+
+    @staticmethod
+    def mark_allocated(funds: Union[CharityProject, Donation]) -> None:
+        """Отметка о том, что пожертвование прошло распределение."""
+
+        if isinstance(funds, Donation):
+            funds.allocated_at = datetime.now()
+
+    def close_invested(
+            self,
+            project_or_donation: Union[CharityProject, Donation]
+    ) -> Union[CharityProject, Donation]:
+        """Завершение сбора средств или транзакции."""
+
+        project_or_donation.fully_invested = True
+        project_or_donation.close_date = datetime.now()
+        return project_or_donation
+
+    def apply_allocation(
+        self,
+        allocation: Allocation,
+        funds: Sequence[Union[CharityProject, Donation]],
+        open_items: Sequence[Union[CharityProject, Donation]]
+    ) -> None:
+        """Перенос результата allocate на записи обеих сторон."""
+
+        for items, deltas, closed in (
+            (funds, allocation.funds_deltas, allocation.closed_funds),
+            (open_items, allocation.open_deltas, allocation.closed_open),
+        ):
+            for item, delta in zip(items, deltas):
+                item.invested_amount += delta
+            for index in closed:
+                self.close_invested(items[index])
+
+    def transfer_pairs(
+        self,
+        allocation: Allocation,
+        funds: Sequence[Union[CharityProject, Donation]],
+        open_items: Sequence
+    ) -> list[tuple]:
+        """Пары (пожертвование, проект, сумма) по результату allocate."""
+
+        pairs = []
+        for funds_index, open_index, amount in transfers(allocation):
+            donation, project = funds[funds_index], open_items[open_index]
+            if not isinstance(donation, Donation):
+                donation, project = project, donation
+            pairs.append((donation, project, amount))
+
+        return pairs
+
+    async def record_transfers(
+        self,
+        pairs: list[tuple],
+        session: AsyncSession
+    ) -> None:
+        """Запись пар transfer_pairs в журнал переводов."""
+
+        await investment_crud.create_transfers(
+            (
+                (donation.id, project.id, amount)
+                for donation, project, amount in pairs
+            ),
+            session
+        )
+
+    async def get_invested_charity_projects(
+            self,
+            charity_project: Union[type[CharityProject], type[Donation]],
+            session: AsyncSession
+    ) -> AsyncIterator[list[Union[CharityProject, Donation]]]:
+        """
+        Получение всех проектов.
+
+        Поток проектов, в которые нужно инвестировать,
+        или средств, которые не были проинвестированны.
+        Записи отдаются порциями по ключу (create_date, id),
+        следующая порция запрашивается только по мере обхода.
+        """
+
+        last_key = None
+
+        while True:
+            query = select(charity_project).where(
+                charity_project.fully_invested.is_(False)
+            ).order_by(
+                charity_project.create_date, charity_project.id
+            ).limit(OPEN_POOL_CHUNK_SIZE)
+
+            if last_key is not None:
+                query = query.where(
+                    tuple_(
+                        charity_project.create_date, charity_project.id
+                    ) > last_key
+                )
+
+            invested_projects = await session.execute(query)
+            chunk = invested_projects.scalars().all()
+
+            if chunk:
+                yield chunk
+
+            if len(chunk) < OPEN_POOL_CHUNK_SIZE:
+                return
+
+            last_key = (chunk[-1].create_date, chunk[-1].id)
+
+    async def _fill_from_open(
+        self,
+        new_records: list[Union[CharityProject, Donation]],
+        counterpart: Union[type[CharityProject], type[Donation]],
+        pairs: list[tuple],
+        session: AsyncSession
+    ) -> int:
+        """
+        Распределение пакета новых записей по открытым записям counterpart.
+
+        Переводы добавляются в pairs,
+        возвращается число закрытых открытых записей.
+        """
+
+        pending = new_records
+        closed_count = 0
+
+        async for chunk in self.get_invested_charity_projects(
+            counterpart, session
+        ):
+            allocation = allocate(
+                [
+                    record.full_amount - record.invested_amount
+                    for record in pending
+                ],
+                [
+                    item.full_amount - item.invested_amount
+                    for item in chunk
+                ]
+            )
+            self.apply_allocation(allocation, pending, chunk)
+            pairs += self.transfer_pairs(allocation, pending, chunk)
+            closed_count += len(allocation.closed_open)
+            pending = pending[len(allocation.closed_funds):]
+
+            if not pending:
+                break
+
+        return closed_count
+
+    async def create_batch(
+        self,
+        requests: list[BaseModel],
+        session: AsyncSession,
+        user: Optional[User] = None
+    ) -> list[Union[CharityProject, Donation]]:
+        """Пакетное создание записей по запросам через bulk_create."""
+
+        owner = {'user_id': user.id} if user is not None else {}
+
+        return await self.bulk_create(
+            [self.model(**request.dict(), **owner) for request in requests],
+            session
+        )
+
+    async def bulk_create(
+        self,
+        records: Sequence[Union[CharityProject, Donation]],
+        session: AsyncSession
+    ) -> Sequence[Union[CharityProject, Donation]]:
+        """
+        Пакетное создание записей с распределением средств.
+
+        Открытые новые записи распределяются по открытым записям
+        другой стороны одним проходом общей очереди и вставляются
+        пакетной вставкой базового CRUD. Итоги открытой очереди
+        и версии данных меняются в той же транзакции.
+        Задача выполняется в очереди распределения
+        и всегда завершается коммитом.
+        """
+
+        return await allocation_queue.submit(
+            partial(self._bulk_create, records, session)
+        )
+
+    async def bulk_update(
+        self,
+        changes: Sequence[dict],
+        session: AsyncSession
+    ) -> int:
+        """
+        Пакетное обновление записей по id с пересчётом итогов.
+
+        Средства по изменённым записям заново не распределяются.
+        """
+
+        return await allocation_queue.submit(partial(
+            self._bulk_change,
+            super().bulk_update,
+            changes,
+            [change['id'] for change in changes],
+            session
+        ))
+
+    async def bulk_delete(
+        self,
+        record_ids: Sequence[int],
+        session: AsyncSession
+    ) -> int:
+        """Пакетное удаление записей по id с пересчётом итогов."""
+
+        return await allocation_queue.submit(partial(
+            self._bulk_change,
+            super().bulk_delete,
+            record_ids,
+            record_ids,
+            session
+        ))
+
+    async def changed_keys(
+        self,
+        record_ids: Sequence[int],
+        session: AsyncSession
+    ) -> set[str]:
+        """Ключи версий данных, которые меняет изменение записей."""
+
+        return data_version_crud.keys_for()
+
+    async def _bulk_create(
+        self,
+        records: Sequence[Union[CharityProject, Donation]],
+        session: AsyncSession
+    ) -> Sequence[Union[CharityProject, Donation]]:
+        await self.lock_open_pool(session)
+
+        counterpart = self.counterpart(self.model)
+        self.fill_defaults(records, self.model.__table__.columns)
+        open_records = [
+            record for record in records if not record.fully_invested
+        ]
+        free_amount = sum(
+            record.full_amount - record.invested_amount
+            for record in open_records
+        )
+        closed_count = 0
+        pairs = []
+        for record in records:
+            self.mark_allocated(record)
+
+        if settings.allocation_engine == 'memory':
+            await order_book.ensure_loaded(session)
+        elif open_records and await open_pool_crud.has_open(
+            counterpart, session
+        ):
+            closed_count = await self._fill_from_open(
+                open_records, counterpart, pairs, session
+            )
+
+        await super().bulk_create(records, session, commit=False)
+        await self.record_transfers(pairs, session)
+
+        if settings.allocation_engine != 'memory':
+            left_amount = sum(
+                record.full_amount - record.invested_amount
+                for record in open_records
+            )
+            transferred = free_amount - left_amount
+            await open_pool_crud.shift(
+                {
+                    self.model: (
+                        sum(not record.fully_invested for record in records),
+                        left_amount,
+                    ),
+                    counterpart: (-closed_count, -transferred),
+                },
+                session
+            )
+
+        await data_version_crud.bump(
+            data_version_crud.keys_for(*records), session
+        )
+        await session.commit()
+        project_list_cache.bump()
+
+        if settings.allocation_engine == 'memory':
+            for record in open_records:
+                order_book.invest(record)
+
+        return records
+
+    async def _bulk_change(
+        self,
+        change: Callable,
+        rows: Sequence,
+        record_ids: Sequence[int],
+        session: AsyncSession
+    ) -> int:
+        """
+        Пакетное изменение в обход распределения.
+
+        Книга заявок записывается до изменения и после него
+        загружается из таблиц заново, итоги открытой очереди
+        пересчитываются по таблицам.
+        """
+
+        await order_book.flush(session)
+        await self.lock_open_pool(session)
+
+        keys = await self.changed_keys(record_ids, session)
+        changed = await change(rows, session, commit=False)
+        await open_pool_crud.recalculate(session)
+        await data_version_crud.bump(keys, session)
+
+        await session.commit()
+        project_list_cache.bump()
+        order_book.reset()
+
+        return changed
@@ -1,13 +1,28 @@
 from dataclasses import dataclass
-from typing import Optional, Union
+from datetime import datetime
+from typing import AsyncIterator, Iterator, Optional, Sequence, Union
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+from sqlalchemy import (
+    Column, bindparam, delete, func, insert, select, tuple_, update
+)
+from sqlalchemy.engine import Row
+from sqlalchemy.sql import Select
+
+from .change_feed import get_change_seq
+from app.constants import MAX_STATEMENT_PARAMETERS, STREAM_CHUNK_SIZE
+from app.core.config import settings
 
 from app.models import CharityProject, Donation, User
 
 
+def chunked(items: Sequence, size: int) -> Iterator[Sequence]:
+    """Последовательные порции items длиной не больше size."""
+
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
 @dataclass
 class CRUD:
     """Реализация работы с БД: Create, Read, ReadAll, Update, Delete."""
@@ -18,9 +33,17 @@ class CRUD:
         self,
         request: BaseModel,
         session: AsyncSession,
-        user: Optional[User] = None
+        user: Optional[User] = None,
+        commit: bool = True
     ):
-        """Создание новой записи в БД."""
+        """
+        Создание новой записи в БД.
+
+        Без commit запись только добавляется в сессию,
+        чтобы сохранить её в одной транзакции с другими изменениями.
+        Сессии приложения не сбрасывают атрибуты при коммите,
+        поэтому запись после вставки не перечитывается.
+        """
 
         data_in_request = request.dict()
 
@@ -30,8 +53,9 @@ class CRUD:
         data_to_db = self.model(**data_in_request)
 
         session.add(data_to_db)
-        await session.commit()
-        await session.refresh(data_to_db)
+
+        if commit:
+            await session.commit()
 
         return data_to_db
 
@@ -54,34 +78,320 @@ class CRUD:
 
         return all_records.scalars().all()
 
+    async def read_rows(
+        self,
+        session: AsyncSession,
+        schema: type[BaseModel],
+        **filters
+    ) -> list[Row]:
+        """
+        Чтение записей из БД без создания ORM объектов.
+
+        Выбираются только колонки схемы ответа, строки не попадают
+        в identity map и не отслеживаются сессией.
+        С фильтрами читается страница по ключу (create_date, id),
+        время ответа не зависит от глубины страницы.
+        """
+
+        rows = await session.execute(self.rows_query(schema, **filters))
+
+        return rows.all()
+
+    async def stream_rows(
+        self,
+        session: AsyncSession,
+        schema: type[BaseModel],
+        **filters
+    ) -> AsyncIterator[dict]:
+        """
+        Потоковое чтение записей из БД.
+
+        Строки читаются курсором на стороне сервера порциями
+        STREAM_CHUNK_SIZE, в памяти одновременно только одна порция.
+        """
+
+        rows = await session.stream(self.rows_query(schema, **filters))
+
+        async for partition in rows.mappings().partitions(
+            STREAM_CHUNK_SIZE
+        ):
+            for row in partition:
+                yield row
+
+    async def read_changes(
+        self,
+        session: AsyncSession,
+        schema: type[BaseModel],
+        since: Optional[tuple[int, int]] = None,
+        limit: Optional[int] = None
+    ) -> list[Row]:
+        """
+        Записи, созданные или изменённые после позиции ленты изменений.
+
+        Читаются колонки схемы и change_seq по ключу (change_seq, id).
+        """
+
+        model = self.model
+        query = select(
+            *self.schema_columns(schema), model.change_seq
+        ).order_by(model.change_seq, model.id).limit(limit)
+
+        if since is not None:
+            query = query.where(tuple_(model.change_seq, model.id) > since)
+
+        rows = await session.execute(query)
+
+        return rows.all()
+
+    def schema_columns(self, schema: type[BaseModel]) -> list[Column]:
+        """Колонки таблицы, которые есть в схеме ответа."""
+
+        columns = self.model.__table__.columns
+
+        return [
+            columns[field] for field in schema.__fields__ if field in columns
+        ]
+
+    def rows_query(self, schema: type[BaseModel], **filters) -> Select:
+        """Запрос колонок схемы: всех записей или страницы по фильтрам."""
+
+        columns = self.schema_columns(schema)
+
+        if not filters:
+            return select(*columns)
+
+        return self.page_query(**filters).with_only_columns(*columns)
+
+    def page_query(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[tuple[datetime, int]] = None,
+        fully_invested: Optional[bool] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        min_amount: Optional[int] = None,
+        max_amount: Optional[int] = None
+    ) -> Select:
+        """Запрос страницы записей по ключу (create_date, id)."""
+
+        model = self.model
+        query = select(model).order_by(model.create_date, model.id)
+
+        if after is not None:
+            query = query.where(tuple_(model.create_date, model.id) > after)
+        if fully_invested is not None:
+            query = query.where(model.fully_invested.is_(fully_invested))
+        if created_from is not None:
+            query = query.where(model.create_date >= created_from)
+        if created_to is not None:
+            query = query.where(model.create_date <= created_to)
+        if min_amount is not None:
+            query = query.where(model.full_amount >= min_amount)
+        if max_amount is not None:
+            query = query.where(model.full_amount <= max_amount)
+        if limit is not None:
+            query = query.limit(limit)
+
+        return query
+
     async def update(
         self,
         db_record: type[Union[CharityProject, Donation, User]],
         request: BaseModel,
-        session: AsyncSession
+        session: AsyncSession,
+        commit: bool = True
     ):
-        """Обновление записи в БД."""
+        """Обновление записи в БД полями, переданными в запросе."""
 
-        db_record_data = jsonable_encoder(db_record)
-        update_data = request.dict(exclude_unset=True)
+        columns = self.model.__table__.columns
 
-        for field in db_record_data:
-            if field in update_data:
-                setattr(db_record, field, update_data[field])
+        for field, value in request.dict(exclude_unset=True).items():
+            if field in columns:
+                setattr(db_record, field, value)
 
         session.add(db_record)
-        await session.commit()
-        await session.refresh(db_record)
+
+        if commit:
+            await session.commit()
+
         return db_record
 
     async def delete(
         self,
         model_in_db: type[Union[CharityProject, Donation, User]],
-        session: AsyncSession
+        session: AsyncSession,
+        commit: bool = True
     ):
         """Удаление записи из БД."""
 
         await session.delete(model_in_db)
-        await session.commit()
+
+        if commit:
+            await session.commit()
 
         return model_in_db
+
+    async def bulk_create(
+        self,
+        records: Sequence[Union[CharityProject, Donation]],
+        session: AsyncSession,
+        commit: bool = True
+    ) -> Sequence[Union[CharityProject, Donation]]:
+        """
+        Пакетная вставка новых записей.
+
+        Записи не добавляются в сессию, незаданные поля заполняются
+        значениями по умолчанию колонок. В PostgreSQL порции
+        по bulk_chunk_size вставляются многострочными INSERT и id
+        возвращаются через RETURNING. В SQLite порции вставляются
+        executemany, а id вычисляются по max(id): после первой вставки
+        транзакция держит блокировку записи, и строки получают
+        идущие подряд rowid.
+        """
+
+        table = self.model.__table__
+        columns = [
+            column for column in table.columns if not column.primary_key
+        ]
+
+        self.fill_defaults(records, columns)
+
+        if 'change_seq' in table.columns:
+            seq = await get_change_seq(session)
+            for record in records:
+                record.change_seq = seq
+
+        rows = [
+            {column.name: getattr(record, column.key) for column in columns}
+            for record in records
+        ]
+
+        if session.bind.dialect.implicit_returning:
+            chunk_size = min(
+                settings.bulk_chunk_size,
+                MAX_STATEMENT_PARAMETERS // len(columns)
+            )
+            new_ids = []
+            for chunk in chunked(rows, chunk_size):
+                inserted = await session.execute(
+                    insert(table).values(chunk).returning(table.c.id)
+                )
+                new_ids += inserted.scalars().all()
+        elif rows:
+            for chunk in chunked(rows, settings.bulk_chunk_size):
+                await session.execute(insert(table), chunk)
+            last_id = await session.scalar(select(func.max(table.c.id)))
+            new_ids = range(last_id - len(rows) + 1, last_id + 1)
+        else:
+            new_ids = []
+
+        for record, record_id in zip(records, new_ids):
+            record.id = record_id
+
+        if commit:
+            await session.commit()
+
+        return records
+
+    @staticmethod
+    def fill_defaults(
+        records: Sequence[Union[CharityProject, Donation]],
+        columns: Sequence[Column]
+    ) -> None:
+        """Заполнение незаданных полей записей значениями по умолчанию."""
+
+        for column in columns:
+            default = column.default
+            if default is None or default.is_sequence or (
+                default.is_clause_element
+            ):
+                continue
+
+            for record in records:
+                if getattr(record, column.key) is None:
+                    setattr(
+                        record,
+                        column.key,
+                        default.arg(None) if default.is_callable
+                        else default.arg
+                    )
+
+    async def bulk_update(
+        self,
+        changes: Sequence[dict],
+        session: AsyncSession,
+        commit: bool = True
+    ) -> int:
+        """
+        Пакетное обновление записей по id.
+
+        changes - словари с id и новыми значениями, набор полей у всех
+        словарей одинаковый. Каждая порция по bulk_chunk_size
+        обновляется одним executemany. Объекты, уже загруженные
+        в сессию, не обновляются. Возвращает число обновлённых строк.
+        """
+
+        if not changes:
+            return 0
+
+        table = self.model.__table__
+        fields = [
+            field for field in changes[0]
+            if field != 'id' and field in table.columns
+        ]
+        values = {field: bindparam(f'new_{field}') for field in fields}
+
+        if 'change_seq' in table.columns:
+            values['change_seq'] = await get_change_seq(session)
+
+        statement = update(table).where(
+            table.c.id == bindparam('record_id')
+        ).values(values)
+
+        updated = 0
+        for chunk in chunked(changes, settings.bulk_chunk_size):
+            result = await session.execute(
+                statement,
+                [
+                    {
+                        'record_id': change['id'],
+                        **{
+                            f'new_{field}': change[field] for field in fields
+                        },
+                    }
+                    for change in chunk
+                ]
+            )
+            updated += result.rowcount
+
+        if commit:
+            await session.commit()
+
+        return updated
+
+    async def bulk_delete(
+        self,
+        record_ids: Sequence[int],
+        session: AsyncSession,
+        commit: bool = True
+    ) -> int:
+        """
+        Пакетное удаление записей по id.
+
+        Каждая порция по bulk_chunk_size удаляется одним DELETE ... IN.
+        Возвращает число удалённых строк.
+        """
+
+        table = self.model.__table__
+
+        deleted = 0
+        for chunk in chunked(list(record_ids), settings.bulk_chunk_size):
+            result = await session.execute(
+                delete(table).where(table.c.id.in_(chunk))
+            )
+            deleted += result.rowcount
+
+        if commit:
+            await session.commit()
+
+        return deleted
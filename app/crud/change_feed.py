@@ -0,0 +1,69 @@
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction, object_session
+
+from app.models import DataVersion
+from app.models.base_model import BaseModel
+
+CHANGE_SEQ_KEY = 'change_seq'
+
+
+def change_seq(session: Session) -> int:
+    """
+    Номер изменения текущей транзакции.
+
+    Номер берётся приращением счётчика в dataversion при первой
+    записи транзакции и общий для всех её строк. Блокировка строки
+    счётчика до коммита упорядочивает номера в порядке коммитов,
+    поэтому читатель ленты не пропускает более ранние изменения.
+    """
+
+    seq = session.info.get(CHANGE_SEQ_KEY)
+    if seq is not None:
+        return seq
+
+    table = DataVersion.__table__
+    connection = session.connection()
+    bumped = connection.execute(
+        update(table).where(
+            table.c.key == CHANGE_SEQ_KEY
+        ).values(version=table.c.version + 1)
+    )
+    if not bumped.rowcount:
+        connection.execute(
+            insert(table).values(key=CHANGE_SEQ_KEY, version=1)
+        )
+
+    seq = connection.scalar(
+        select(table.c.version).where(table.c.key == CHANGE_SEQ_KEY)
+    )
+    session.info[CHANGE_SEQ_KEY] = seq
+
+    return seq
+
+
+async def get_change_seq(session: AsyncSession) -> int:
+    """Номер изменения для записи строк в обход ORM."""
+
+    return await session.run_sync(change_seq)
+
+
+@event.listens_for(BaseModel, 'before_insert', propagate=True)
+def stamp_inserted(mapper, connection, target: BaseModel) -> None:
+    target.change_seq = change_seq(object_session(target))
+
+
+@event.listens_for(BaseModel, 'before_update', propagate=True)
+def stamp_updated(mapper, connection, target: BaseModel) -> None:
+    session = object_session(target)
+    if session.is_modified(target):
+        target.change_seq = change_seq(session)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def reset_change_seq(
+    session: Session,
+    transaction: SessionTransaction
+) -> None:
+    if transaction.parent is None:
+        session.info.pop(CHANGE_SEQ_KEY, None)
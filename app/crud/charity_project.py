@@ -1,13 +1,21 @@
-from typing import Optional
+from typing import Iterable, Optional, Sequence
 
-from sqlalchemy import func, select
+from pydantic import BaseModel
+from sqlalchemy import false, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .base_crud import CRUD
+from .allocation import CRUDAllocation
+from .base_crud import chunked
+from .data_version import PROJECTS_VERSION_KEY, data_version_crud
+from .open_pool import open_pool_crud
+from app.constants import MAX_STATEMENT_PARAMETERS
+from app.core.project_names import project_name_index
+from app.core.response_cache import project_list_cache
+from app.core.sql_functions import days_between
 from app.models.charity_project import CharityProject
 
 
-class CRUDCharityProject(CRUD):
+class CRUDCharityProject(CRUDAllocation):
     """Расширенный CRUD класс для проектов."""
 
     async def get_project_id_by_name(
@@ -25,24 +33,156 @@ class CRUDCharityProject(CRUD):
 
         return db_project_id.scalars().first()
 
-    async def get_projects_by_completion_rate(
+    async def get_by_id_or_name(
             self,
+            project_id: Optional[int],
+            project_name: Optional[str],
             session: AsyncSession,
     ) -> list[CharityProject]:
-        """Сортировка всех закрытых проектов по количеству времени."""
+        """Проекты с указанным id или именем одним запросом."""
+
+        conditions = [false()]
+        if project_id is not None:
+            conditions.append(CharityProject.id == project_id)
+        if project_name is not None:
+            conditions.append(CharityProject.name == project_name)
 
-        difference_in_days = (
-            func.julianday(CharityProject.close_date) -
-            func.julianday(CharityProject.create_date)
+        projects = await session.execute(
+            select(CharityProject).where(or_(*conditions))
         )
 
+        return projects.scalars().all()
+
+    async def get_taken_names(
+            self,
+            project_names: Iterable[str],
+            session: AsyncSession,
+    ) -> set[str]:
+        """
+        Занятые имена из переданных.
+
+        Обычно это один запрос: имена делятся на порции только
+        сверх предела параметров одного запроса SQLite и asyncpg.
+        """
+
+        taken = set()
+        for chunk in chunked(list(project_names), MAX_STATEMENT_PARAMETERS):
+            names = await session.scalars(
+                select(CharityProject.name).where(
+                    CharityProject.name.in_(chunk)
+                )
+            )
+            taken.update(names)
+
+        return taken
+
+    async def get_projects_by_completion_rate(
+            self,
+            session: AsyncSession,
+    ) -> list[CharityProject]:
+        """Сортировка всех закрытых проектов по количеству времени."""
+
         projects = await session.execute(
             select(CharityProject).where(
                 CharityProject.fully_invested.is_(True)
-            ).order_by(difference_in_days)
+            ).order_by(
+                days_between(
+                    CharityProject.close_date, CharityProject.create_date
+                )
+            )
         )
 
         return projects.scalars().all()
 
+    async def bulk_create(
+        self,
+        records: Sequence[CharityProject],
+        session: AsyncSession
+    ) -> Sequence[CharityProject]:
+        """Пакетное создание проектов с добавлением имён в индекс."""
+
+        records = await super().bulk_create(records, session)
+        for record in records:
+            project_name_index.add(record.name)
+
+        return records
+
+    async def bulk_update(
+        self,
+        changes: Sequence[dict],
+        session: AsyncSession
+    ) -> int:
+        """Пакетное обновление проектов, индекс имён строится заново."""
+
+        updated = await super().bulk_update(changes, session)
+        project_name_index.clear()
+
+        return updated
+
+    async def update(
+        self,
+        db_record: CharityProject,
+        request: BaseModel,
+        session: AsyncSession,
+        commit: bool = True
+    ) -> CharityProject:
+        """Обновление проекта с переносом изменения остатка в итоги."""
+
+        was_open = not db_record.fully_invested
+        remaining = db_record.full_amount - db_record.invested_amount
+
+        db_record = await super().update(
+            db_record, request, session, commit=False
+        )
+
+        if was_open:
+            await open_pool_crud.shift(
+                {
+                    CharityProject: (
+                        -int(db_record.fully_invested),
+                        db_record.full_amount - db_record.invested_amount -
+                        remaining,
+                    ),
+                },
+                session
+            )
+
+        await data_version_crud.bump([PROJECTS_VERSION_KEY], session)
+
+        if commit:
+            await session.commit()
+            project_list_cache.bump()
+
+        return db_record
+
+    async def delete(
+        self,
+        model_in_db: CharityProject,
+        session: AsyncSession,
+        commit: bool = True
+    ) -> CharityProject:
+        """Удаление проекта с исключением его остатка из итогов."""
+
+        model_in_db = await super().delete(model_in_db, session, commit=False)
+
+        if not model_in_db.fully_invested:
+            await open_pool_crud.shift(
+                {
+                    CharityProject: (
+                        -1,
+                        model_in_db.invested_amount - model_in_db.full_amount,
+                    ),
+                },
+                session
+            )
+
+        await data_version_crud.bump([PROJECTS_VERSION_KEY], session)
+
+        if commit:
+            await session.commit()
+            project_list_cache.bump()
+
+        return model_in_db
+
 
 charity_project_crud = CRUDCharityProject(CharityProject)
@@ -0,0 +1,72 @@
+from typing import Iterable, Union
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base_crud import CRUD
+from app.models import CharityProject, DataVersion, Donation
+
+PROJECTS_VERSION_KEY = 'charityproject'
+
+
+def user_donations_key(user_id: int) -> str:
+    """Ключ версии списка пожертвований пользователя."""
+
+    return f'donation:user:{user_id}'
+
+
+class CRUDDataVersion(CRUD):
+    """
+    CRUD класс для версий данных.
+
+    Версия увеличивается атомарным приращением в транзакции записи,
+    строка ключа создаётся при первом изменении.
+    """
+
+    async def get_version(self, key: str, session: AsyncSession) -> int:
+        """Текущая версия ключа, 0 если данные ещё не менялись."""
+
+        version = await session.scalar(
+            select(DataVersion.version).where(DataVersion.key == key)
+        )
+
+        return version or 0
+
+    async def etag(self, key: str, session: AsyncSession) -> str:
+        """Сильный ETag по версии ключа."""
+
+        version = await self.get_version(key, session)
+
+        return f'"{key}.{version}"'
+
+    async def bump(self, keys: Iterable[str], session: AsyncSession) -> None:
+        """Увеличение версий ключей в текущей транзакции."""
+
+        for key in keys:
+            bumped = await session.execute(
+                update(DataVersion).where(
+                    DataVersion.key == key
+                ).values(
+                    version=DataVersion.version + 1
+                ).execution_options(synchronize_session=False)
+            )
+
+            if not bumped.rowcount:
+                session.add(DataVersion(key=key, version=1))
+                await session.flush()
+
+    @staticmethod
+    def keys_for(
+        *records: Union[CharityProject, Donation]
+    ) -> set[str]:
+        """Ключи, которые меняет распределение с участием записей."""
+
+        keys = {PROJECTS_VERSION_KEY}
+        for record in records:
+            if isinstance(record, Donation) and record.user_id is not None:
+                keys.add(user_donations_key(record.user_id))
+
+        return keys
+
+
+data_version_crud = CRUDDataVersion(DataVersion)
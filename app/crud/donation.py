@@ -1,111 +1,480 @@
-from asyncio import get_event_loop
-from typing import Optional, Union
+from functools import partial
+from typing import AsyncIterator, Callable, Optional, Sequence, Union
 from datetime import datetime
 
-from sqlalchemy import select
+from pydantic import BaseModel
+from sqlalchemy import func, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .base_crud import CRUD
+from .allocation import CRUDAllocation
+from .base_crud import CRUD, chunked
+from .charity_project import charity_project_crud
+from .data_version import data_version_crud, user_donations_key
+from app.constants import MAX_STATEMENT_PARAMETERS
+from app.core.allocation import allocate
+from app.core.allocation_queue import allocation_queue
+from app.core.config import settings
+from app.core.order_book import order_book
+from app.core.response_cache import project_list_cache
+from app.crud.open_pool import open_pool_crud
 from app.models import CharityProject, Donation
 
 
-class CRUDDonation(CRUD):
+class CRUDDonation(CRUDAllocation):
     """Расширенный CRUD класс для пожертвований."""
 
     async def get_user_donations(
         self,
         user_id: int,
-        session: AsyncSession
+        session: AsyncSession,
+        schema: Optional[type[BaseModel]] = None
     ):
-        """Поиск пожертвований по id пользователя."""
+        """
+        Поиск пожертвований по id пользователя.
+
+        Со схемой ответа выбираются только её колонки,
+        без создания ORM объектов.
+        """
+
+        query = select(Donation)
+        if schema is not None:
+            query = select(*self.schema_columns(schema))
 
         donations = await session.execute(
-            select(Donation).where(Donation.user_id == user_id)
+            query.where(Donation.user_id == user_id)
         )
 
+        if schema is not None:
+            return donations.all()
         return donations.scalars().all()
 
-    async def distribution_of_resources(
+    async def changed_keys(
+        self,
+        record_ids: Sequence[int],
+        session: AsyncSession
+    ) -> set[str]:
+        """Ключи версий с версиями списков пожертвований владельцев."""
+
+        keys = await super().changed_keys(record_ids, session)
+        for chunk in chunked(list(record_ids), MAX_STATEMENT_PARAMETERS):
+            user_ids = await session.scalars(
+                select(Donation.user_id).where(
+                    Donation.id.in_(chunk), Donation.user_id.is_not(None)
+                ).distinct()
+            )
+            keys.update(user_donations_key(user_id) for user_id in user_ids)
+
+        return keys
+
+    async def invest(
         self,
-        project_or_donation: list[Union[CharityProject, Donation]],
         funds: Union[CharityProject, Donation],
         session: AsyncSession
     ) -> Union[CharityProject, Donation]:
-        """Распределение средств."""
+        """
+        Сохранение и распределение новых средств.
 
-        if not project_or_donation:
-            await session.commit()
+        Распределение выполняется в очереди распределения,
+        в том числе книгой заявок в режиме memory: книга не меняется,
+        пока задача изменения проекта сверяет её с БД.
+        """
+
+        return await allocation_queue.submit(
+            partial(self._invest, funds, session)
+        )
+
+    async def _invest_in_book(
+        self,
+        funds: Union[CharityProject, Donation],
+        session: AsyncSession
+    ) -> Union[CharityProject, Donation]:
+        """Сохранение средств и распределение книгой заявок."""
+
+        self.mark_allocated(funds)
+        session.add(funds)
+        await data_version_crud.bump(
+            data_version_crud.keys_for(funds), session
+        )
+        await session.commit()
+        project_list_cache.bump()
+        await order_book.ensure_loaded(session, exclude=funds)
+
+        return order_book.invest(funds)
+
+    async def _invest(
+        self,
+        funds: Union[CharityProject, Donation],
+        session: AsyncSession
+    ) -> Union[CharityProject, Donation]:
+        """
+        Распределение новых средств выбранным в настройках движком.
+
+        Запись средств, распределение и итоги открытой очереди
+        фиксируются одной транзакцией. Если открытых записей другой
+        стороны нет, запрос открытой очереди не выполняется.
+        Новая запись вставляется одним INSERT вместе с отметкой
+        о распределении и после коммита не перечитывается.
+        """
+
+        if settings.allocation_engine == 'memory':
+            return await self._invest_in_book(funds, session)
+
+        await self.lock_open_pool(session)
+        self.mark_allocated(funds)
+        session.add(funds)
+        await session.flush()
+        if inspect(funds).expired_attributes:
             await session.refresh(funds)
-            return funds
 
-        for current_project_or_donation in project_or_donation:
-            funds_diff = funds.full_amount - funds.invested_amount
-            item_diff = (
-                current_project_or_donation.full_amount -
-                current_project_or_donation.invested_amount
+        if funds.fully_invested:
+            await data_version_crud.bump(
+                data_version_crud.keys_for(funds), session
             )
+            await session.commit()
+            project_list_cache.bump()
+            return funds
 
-            if funds_diff >= item_diff:
-                funds.invested_amount += item_diff
-                current_project_or_donation.invested_amount = (
-                    current_project_or_donation.full_amount
-                )
+        counterpart = self.counterpart(funds)
+        free_amount = funds.full_amount - funds.invested_amount
+        closed_count = 0
 
-                await get_event_loop().run_in_executor(
-                    None, self.close_invested, current_project_or_donation
+        if await open_pool_crud.has_open(counterpart, session):
+            if settings.allocation_engine == 'sql':
+                closed_count = await self.distribution_of_resources_sql(
+                    funds, session
                 )
+            else:
+                closed_count = await self.distribution_of_resources(
+                    self.get_invested_charity_projects(counterpart, session),
+                    funds,
+                    session
+                )
+
+        transferred = free_amount - (
+            funds.full_amount - funds.invested_amount
+        )
+        await open_pool_crud.shift(
+            {
+                type(funds): (
+                    int(not funds.fully_invested), free_amount - transferred
+                ),
+                counterpart: (-closed_count, -transferred),
+            },
+            session
+        )
+        await data_version_crud.bump(
+            data_version_crud.keys_for(funds), session
+        )
 
-                if funds_diff == item_diff:
-                    await get_event_loop().run_in_executor(
-                        None, self.close_invested, funds
-                    )
+        await session.commit()
+        project_list_cache.bump()
 
-                    break
-            else:
-                current_project_or_donation.invested_amount += funds_diff
-                funds.invested_amount = funds.full_amount
+        return funds
+
+    async def reinvest(
+        self,
+        project: CharityProject,
+        request: BaseModel,
+        session: AsyncSession,
+        check: Optional[Callable[[CharityProject], None]] = None
+    ) -> CharityProject:
+        """
+        Изменение проекта с довложением ожидающих пожертвований.
+
+        Изменение, распределение и итоги открытой очереди
+        фиксируются одной транзакцией. Затрагиваются только
+        изменённый проект и пожертвования, покрывающие новый остаток.
+        check повторяет проверки запроса по проекту, перечитанному
+        под блокировкой распределения, и прерывает изменение
+        исключением. В режиме memory перед перечитыванием
+        записывается книга заявок, после коммита изменение
+        переносится в книгу.
+        """
+
+        return await allocation_queue.submit(
+            partial(self._reinvest, project, request, session, check)
+        )
+
+    async def _reinvest(
+        self,
+        project: CharityProject,
+        request: BaseModel,
+        session: AsyncSession,
+        check: Optional[Callable[[CharityProject], None]] = None
+    ) -> CharityProject:
+        await order_book.flush(session)
+        await self.lock_open_pool(session)
+        await session.refresh(project)
+
+        if check is not None:
+            check(project)
+
+        project = await charity_project_crud.update(
+            project, request, session, commit=False
+        )
+
+        if not project.fully_invested:
+            free_amount = project.full_amount - project.invested_amount
+            closed_count = 0
 
-                await get_event_loop().run_in_executor(
-                    None, self.close_invested, funds
+            if free_amount and await open_pool_crud.has_open(
+                Donation, session
+            ):
+                closed_count = await self.distribution_of_resources(
+                    self.get_invested_charity_projects(Donation, session),
+                    project,
+                    session
                 )
 
-                break
+            if project.full_amount == project.invested_amount:
+                self.close_invested(project)
+
+            transferred = free_amount - (
+                project.full_amount - project.invested_amount
+            )
+            await open_pool_crud.shift(
+                {
+                    CharityProject: (
+                        -int(project.fully_invested), -transferred
+                    ),
+                    Donation: (-closed_count, -transferred),
+                },
+                session
+            )
 
-            session.add(current_project_or_donation)
-        session.add(funds)
         await session.commit()
-        await session.refresh(funds)
+        project_list_cache.bump()
+        order_book.sync(project)
 
-        return funds
+        return project
 
-    def close_invested(
-            self,
-            project_or_donation: Union[CharityProject, Donation]
-    ) -> Union[CharityProject, Donation]:
-        """Завершение сбора средств или транзакции."""
+    async def delete_project(
+        self,
+        project: CharityProject,
+        session: AsyncSession,
+        check: Optional[Callable[[CharityProject], None]] = None
+    ) -> CharityProject:
+        """
+        Удаление проекта через очередь распределения.
 
-        project_or_donation.fully_invested = True
-        project_or_donation.close_date = datetime.now()
-        return project_or_donation
+        check повторяет проверки запроса по перечитанному проекту,
+        поэтому в проект не попадут переводы между проверкой
+        и удалением. В режиме memory перед перечитыванием
+        записывается книга заявок, затем проект удаляется из неё.
+        """
+
+        return await allocation_queue.submit(
+            partial(self._delete_project, project, session, check)
+        )
+
+    async def _delete_project(
+        self,
+        project: CharityProject,
+        session: AsyncSession,
+        check: Optional[Callable[[CharityProject], None]] = None
+    ) -> CharityProject:
+        await order_book.flush(session)
+        await self.lock_open_pool(session)
+        await session.refresh(project)
+
+        if check is not None:
+            check(project)
+
+        project = await charity_project_crud.delete(project, session)
+        order_book.discard(project)
+
+        return project
+
+    async def defer(
+        self,
+        donation: Donation,
+        session: AsyncSession
+    ) -> Donation:
+        """
+        Сохранение пожертвования без распределения.
+
+        Пожертвование сразу входит в открытую очередь,
+        распределяет его фоновый проход allocate_pending.
+        """
+
+        session.add(donation)
+        await open_pool_crud.shift(
+            {Donation: (1, donation.full_amount)}, session
+        )
+        await data_version_crud.bump(
+            [user_donations_key(donation.user_id)], session
+        )
+        await session.commit()
+
+        return donation
 
-    async def get_invested_charity_projects(
-            self,
-            charity_project: Union[type[CharityProject], type[Donation]],
-            session: AsyncSession
-    ) -> Optional[list[Union[CharityProject, Donation]]]:
+    async def allocate_pending(self, session: AsyncSession) -> int:
         """
-        Получение всех проектов.
+        Распределение всех отложенных пожертвований одним проходом.
 
-        Получение всех проектов, в которые нужно инвестировать
-        или средств, которые не были проинвестированны.
+        Возвращает число обработанных пожертвований.
         """
 
-        invested_projects = await session.execute(
-            select(charity_project).where(
-                charity_project.fully_invested.is_(False)
-            ).order_by(charity_project.create_date)
+        return await allocation_queue.submit(
+            partial(self._allocate_pending, session)
         )
-        return invested_projects.scalars().all()
+
+    async def _allocate_pending(self, session: AsyncSession) -> int:
+        await self.lock_open_pool(session)
+
+        pending = await session.execute(
+            select(Donation).where(
+                Donation.allocated_at.is_(None)
+            ).order_by(Donation.create_date, Donation.id)
+        )
+        pending = pending.scalars().all()
+
+        open_donations = [
+            donation for donation in pending if not donation.fully_invested
+        ]
+        free_amount = sum(
+            donation.full_amount - donation.invested_amount
+            for donation in open_donations
+        )
+        closed_count = 0
+        pairs = []
+
+        if open_donations and await open_pool_crud.has_open(
+            CharityProject, session
+        ):
+            closed_count = await self._fill_from_open(
+                open_donations, CharityProject, pairs, session
+            )
+
+        await self.record_transfers(pairs, session)
+
+        transferred = free_amount - sum(
+            donation.full_amount - donation.invested_amount
+            for donation in open_donations
+        )
+        closed_donations = sum(
+            donation.fully_invested for donation in open_donations
+        )
+        await open_pool_crud.shift(
+            {
+                Donation: (-closed_donations, -transferred),
+                CharityProject: (-closed_count, -transferred),
+            },
+            session
+        )
+
+        for donation in pending:
+            self.mark_allocated(donation)
+        await data_version_crud.bump(data_version_crud.keys_for(), session)
+
+        await session.commit()
+        project_list_cache.bump()
+
+        return len(pending)
+
+    async def distribution_of_resources(
+        self,
+        project_or_donation: AsyncIterator[list],
+        funds: Union[CharityProject, Donation],
+        session: AsyncSession
+    ) -> int:
+        """
+        Распределение средств.
+
+        Открытые записи читаются из потока порциями, поэтому обход
+        прекращается, как только средства закончились.
+        Возвращает число закрытых открытых записей.
+        """
+
+        closed_count = 0
+        pairs = []
+
+        async for chunk in project_or_donation:
+            allocation = allocate(
+                [funds.full_amount - funds.invested_amount],
+                [item.full_amount - item.invested_amount for item in chunk]
+            )
+            self.apply_allocation(allocation, [funds], chunk)
+            pairs += self.transfer_pairs(allocation, [funds], chunk)
+            closed_count += len(allocation.closed_open)
+
+            if funds.fully_invested:
+                break
+
+        session.add(funds)
+        await self.record_transfers(pairs, session)
+
+        return closed_count
+
+    async def distribution_of_resources_sql(
+        self,
+        funds: Union[CharityProject, Donation],
+        session: AsyncSession
+    ) -> int:
+        """
+        Распределение средств на стороне БД.
+
+        Нарастающий итог остатков открытых записей в порядке create_date
+        считается оконной функцией, из БД выбираются только записи,
+        которые покрываются средствами, и обновляются одним UPDATE.
+        Возвращает число закрытых открытых записей.
+        """
+
+        model = self.counterpart(funds)
+        free_amount = funds.full_amount - funds.invested_amount
+        remaining = model.full_amount - model.invested_amount
+
+        open_queue = select(
+            model.id,
+            model.invested_amount,
+            remaining.label('remaining'),
+            func.sum(remaining).over(
+                order_by=(model.create_date, model.id),
+                rows=(None, 0),
+            ).label('running_total'),
+        ).where(model.fully_invested.is_(False)).subquery()
+
+        affected = await session.execute(
+            select(open_queue).where(
+                open_queue.c.running_total - open_queue.c.remaining <
+                free_amount
+            ).order_by(open_queue.c.running_total)
+        )
+        affected_rows = affected.all()
+
+        allocation = allocate(
+            [free_amount], [row.remaining for row in affected_rows]
+        )
+        closed = set(allocation.closed_open)
+        now = datetime.now()
+
+        await CRUD(model).bulk_update(
+            [
+                {
+                    'id': row.id,
+                    'invested_amount': row.invested_amount + delta,
+                    'fully_invested': index in closed,
+                    'close_date': now if index in closed else None,
+                }
+                for index, (row, delta) in enumerate(
+                    zip(affected_rows, allocation.open_deltas)
+                )
+            ],
+            session,
+            commit=False
+        )
+
+        funds.invested_amount += sum(allocation.funds_deltas)
+
+        if allocation.closed_funds:
+            self.close_invested(funds)
+
+        session.add(funds)
+        await self.record_transfers(
+            self.transfer_pairs(allocation, [funds], affected_rows), session
+        )
+
+        return len(closed)
 
 
 donation_crud = CRUDDonation(Donation)
@@ -0,0 +1,64 @@
+from typing import Iterable
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base_crud import CRUD
+from app.models import Donation, Investment
+
+
+class CRUDInvestment(CRUD):
+    """CRUD класс для журнала переводов."""
+
+    async def create_transfers(
+        self,
+        transfers: Iterable[tuple[int, int, int]],
+        session: AsyncSession
+    ) -> None:
+        """Запись переводов (donation_id, project_id, amount) одним INSERT."""
+
+        transfer_rows = [
+            {'donation_id': donation_id, 'project_id': project_id,
+             'amount': amount}
+            for donation_id, project_id, amount in transfers
+        ]
+
+        if transfer_rows:
+            await session.execute(
+                insert(Investment.__table__), transfer_rows
+            )
+
+    async def get_user_investments(
+        self,
+        user_id: int,
+        session: AsyncSession
+    ) -> list[Investment]:
+        """Переводы из пожертвований пользователя."""
+
+        investments = await session.execute(
+            select(Investment).join(
+                Donation, Donation.id == Investment.donation_id
+            ).where(
+                Donation.user_id == user_id
+            ).order_by(Investment.donation_id, Investment.created_at)
+        )
+
+        return investments.scalars().all()
+
+    async def get_project_investments(
+        self,
+        project_id: int,
+        session: AsyncSession
+    ) -> list[Investment]:
+        """Переводы в проект."""
+
+        investments = await session.execute(
+            select(Investment).where(
+                Investment.project_id == project_id
+            ).order_by(Investment.created_at, Investment.id)
+        )
+
+        return investments.scalars().all()
+
+
+investment_crud = CRUDInvestment(Investment)
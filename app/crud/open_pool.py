@@ -0,0 +1,111 @@
+from typing import Optional, Union
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base_crud import CRUD
+from app.constants import OPEN_POOL_ID
+from app.models import CharityProject, Donation, OpenPool
+
+
+class CRUDOpenPool(CRUD):
+    """
+    CRUD класс для итогов открытой очереди.
+
+    Строка итогов меняется атомарными приращениями в той же
+    транзакции, что и записи. Если строки нет, она пересчитывается
+    по таблицам, так же итоги восстанавливаются после записи в обход API.
+    """
+
+    fields = {
+        CharityProject: ('projects_count', 'projects_remaining'),
+        Donation: ('donations_count', 'donations_remaining'),
+    }
+
+    async def get(self, session: AsyncSession) -> Optional[OpenPool]:
+        """Получение строки итогов."""
+
+        return await session.get(
+            OpenPool, OPEN_POOL_ID, populate_existing=True
+        )
+
+    async def has_open(
+        self,
+        model: Union[type[CharityProject], type[Donation]],
+        session: AsyncSession
+    ) -> bool:
+        """
+        Есть ли открытые записи модели.
+
+        Без строки итогов ответ неизвестен, поэтому считается, что есть.
+        """
+
+        open_pool = await self.get(session)
+
+        if open_pool is None:
+            return True
+
+        return getattr(open_pool, self.fields[model][0]) > 0
+
+    async def calculate(self, session: AsyncSession) -> dict[str, int]:
+        """Итоги по открытым записям таблиц без записи в БД."""
+
+        totals = {}
+        for model, (count_field, remaining_field) in self.fields.items():
+            open_totals = await session.execute(
+                select(
+                    func.count(model.id),
+                    func.coalesce(
+                        func.sum(model.full_amount - model.invested_amount), 0
+                    ),
+                ).where(model.fully_invested.is_(False))
+            )
+            totals[count_field], totals[remaining_field] = open_totals.one()
+
+        return totals
+
+    async def recalculate(self, session: AsyncSession) -> OpenPool:
+        """Пересчёт итогов по открытым записям таблиц."""
+
+        await session.flush()
+
+        return await session.merge(
+            OpenPool(id=OPEN_POOL_ID, **await self.calculate(session))
+        )
+
+    async def shift(
+        self,
+        changes: dict[type, tuple[int, int]],
+        session: AsyncSession
+    ) -> None:
+        """
+        Приращение итогов.
+
+        changes сопоставляет модели изменение числа открытых записей
+        и суммы их остатков.
+        """
+
+        values = {}
+        for model, (count, remaining) in changes.items():
+            count_field, remaining_field = self.fields[model]
+            if count:
+                values[count_field] = getattr(OpenPool, count_field) + count
+            if remaining:
+                values[remaining_field] = (
+                    getattr(OpenPool, remaining_field) + remaining
+                )
+
+        if not values:
+            return
+
+        shifted = await session.execute(
+            update(OpenPool).where(
+                OpenPool.id == OPEN_POOL_ID
+            ).values(**values).execution_options(synchronize_session=False)
+        )
+
+        if not shifted.rowcount:
+            await self.recalculate(session)
+
+
+open_pool_crud = CRUDOpenPool(OpenPool)
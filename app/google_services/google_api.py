@@ -2,7 +2,6 @@ from copy import deepcopy
 from datetime import datetime
 
 from aiogoogle import Aiogoogle
-from sqlalchemy import func
 
 from app.constants import FORMAT, SPREADSHEET_BODY, TABLE_VALUES_DRAFT
 from app.core.config import settings
@@ -55,10 +54,6 @@ async def spreadsheets_update_value(
     """Обновление данных."""
 
     now_date_time = datetime.now().strftime(FORMAT)
-    difference_in_days = (
-        func.julianday(CharityProject.close_date) -
-        func.julianday(CharityProject.create_date)
-    )
     service = await wrapper_services.discover('sheets', 'v4')
 
     table_values = [row for row in TABLE_VALUES_DRAFT]
@@ -66,9 +61,9 @@ async def spreadsheets_update_value(
 
     for project in charity_projects:
         table_values.append((
-            str(project['name']),
-            str(difference_in_days),
-            str(project['description'])
+            str(project.name),
+            str(project.close_date - project.create_date),
+            str(project.description)
         ))
 
     update_body = {
@@ -1,14 +1,42 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 from app.api.routers import main_router
+from app.core.allocation_queue import allocation_queue
 from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.core.deferred_allocation import deferred_allocation
 from app.core.init_db import create_first_superuser
+from app.core.order_book import order_book
+from app.core.project_names import project_name_index
+from app.core.response_cache import project_list_cache
 
-app = FastAPI(title=settings.app_title)
+app = FastAPI(
+    title=settings.app_title,
+    default_response_class=ORJSONResponse,
+)
 
 app.include_router(main_router)
 
 
 @app.on_event('startup')
 async def startup():
+    allocation_queue.start()
+    if settings.allocation_engine == 'memory':
+        await order_book.start(
+            AsyncSessionLocal, settings.order_book_flush_interval
+        )
+    elif settings.deferred_allocation:
+        deferred_allocation.start(
+            AsyncSessionLocal, settings.deferred_allocation_window
+        )
     await create_first_superuser()
+
+
+@app.on_event('shutdown')
+async def shutdown():
+    await deferred_allocation.stop()
+    await allocation_queue.stop()
+    await order_book.stop(AsyncSessionLocal)
+    project_name_index.clear()
+    project_list_cache.clear()
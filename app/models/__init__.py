@@ -1,3 +1,6 @@
 from .charity_project import CharityProject # noqa
 from .donation import Donation # noqa
-from .user import User # noqa
\ No newline at end of file
+from .investment import Investment # noqa
+from .user import User # noqa
+from .open_pool import OpenPool # noqa
+from .data_version import DataVersion # noqa
\ No newline at end of file
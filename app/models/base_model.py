@@ -1,10 +1,44 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Integer
+from sqlalchemy import (
+    BigInteger, Boolean, Column, DateTime, Index, Integer, column
+)
+from sqlalchemy.orm import declared_attr
 
 from app.core.db import Base
 from app.constants import DEFAULT_INVESTED_AMOUNT
 
+OPEN_POOL_CONDITION = column('fully_invested').is_(False)
+
+
+def open_pool_index(table_name: str) -> Index:
+    """
+    Частичный индекс открытых записей в порядке создания.
+
+    Условие совпадает с фильтром запросов открытой очереди,
+    иначе SQLite не использует частичный индекс.
+    """
+
+    return Index(
+        f'ix_{table_name}_open_create_date',
+        'create_date',
+        'id',
+        sqlite_where=OPEN_POOL_CONDITION,
+        postgresql_where=OPEN_POOL_CONDITION,
+    )
+
+
+def keyset_index(table_name: str) -> Index:
+    """Индекс ключа (create_date, id) для постраничного чтения."""
+
+    return Index(f'ix_{table_name}_create_date_id', 'create_date', 'id')
+
+
+def change_feed_index(table_name: str) -> Index:
+    """Индекс ключа (change_seq, id) для ленты изменений."""
+
+    return Index(f'ix_{table_name}_change_seq_id', 'change_seq', 'id')
+
 
 class BaseModel(Base):
     """
@@ -25,3 +59,12 @@ class BaseModel(Base):
     fully_invested = Column(Boolean, nullable=False, default=False)
     create_date = Column(DateTime, nullable=False, default=datetime.now)
     close_date = Column(DateTime, default=None)
+    change_seq = Column(BigInteger, nullable=False, default=0)
+
+    @declared_attr
+    def __table_args__(cls):
+        return (
+            open_pool_index(cls.__tablename__),
+            keyset_index(cls.__tablename__),
+            change_feed_index(cls.__tablename__),
+        )
@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, Column, String
+
+from app.core.db import Base
+
+
+class DataVersion(Base):
+    """
+    Версии данных для условных запросов.
+
+    Каждая запись, меняющая ответы, увеличивает версию своего ключа
+    в той же транзакции. ETag ответа строится по версии,
+    поэтому проверка If-None-Match не читает сами данные.
+    """
+
+    key = Column(String(100), unique=True, nullable=False)
+    version = Column(BigInteger, nullable=False, default=0)
@@ -1,6 +1,13 @@
-from sqlalchemy import Column, ForeignKey, Integer, Text
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Index, Integer, Text, column
+)
+from sqlalchemy.orm import declared_attr
 
-from .base_model import BaseModel
+from .base_model import (
+    BaseModel, change_feed_index, keyset_index, open_pool_index
+)
+
+PENDING_CONDITION = column('allocated_at').is_(None)
 
 
 class Donation(BaseModel):
@@ -11,6 +18,25 @@ class Donation(BaseModel):
         ForeignKey('user.id', name='fk_donation_user_id_user'),
     )
     comment = Column(Text)
+    allocated_at = Column(DateTime, default=None)
+
+    @declared_attr
+    def __table_args__(cls):
+        return (
+            open_pool_index(cls.__tablename__),
+            keyset_index(cls.__tablename__),
+            change_feed_index(cls.__tablename__),
+            Index(
+                'ix_donation_user_id_create_date', 'user_id', 'create_date'
+            ),
+            Index(
+                'ix_donation_pending_create_date',
+                'create_date',
+                'id',
+                sqlite_where=PENDING_CONDITION,
+                postgresql_where=PENDING_CONDITION,
+            ),
+        )
 
     def __repr__(self):
         return (
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer
+
+from app.core.db import Base
+
+
+class Investment(Base):
+    """
+    Модель переводов из пожертвования в проект.
+
+    Каждый проход распределения записывает по строке
+    на каждую пару пожертвования и проекта.
+    """
+
+    donation_id = Column(
+        Integer,
+        ForeignKey('donation.id', name='fk_investment_donation_id_donation'),
+        nullable=False,
+    )
+    project_id = Column(
+        Integer,
+        ForeignKey(
+            'charityproject.id', name='fk_investment_project_id_charityproject'
+        ),
+        nullable=False,
+    )
+    amount = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        Index(
+            'ix_investment_donation_id_created_at',
+            'donation_id',
+            'created_at',
+        ),
+        Index(
+            'ix_investment_project_id_created_at',
+            'project_id',
+            'created_at',
+        ),
+    )
@@ -0,0 +1,18 @@
+from sqlalchemy import BigInteger, Column, Integer
+
+from app.core.db import Base
+
+
+class OpenPool(Base):
+    """
+    Итоги открытой очереди.
+
+    Единственная строка с числом и суммой остатков открытых проектов
+    и пожертвований, поддерживается путями создания, распределения
+    и закрытия записей.
+    """
+
+    projects_count = Column(Integer, nullable=False, default=0)
+    projects_remaining = Column(BigInteger, nullable=False, default=0)
+    donations_count = Column(Integer, nullable=False, default=0)
+    donations_remaining = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+
+from .charity_project import CharityProjectsRead
+from .donation import SuperUserDonationRead
+
+
+class ChangesRead(BaseModel):
+    """Схема страницы ленты изменений."""
+
+    charity_projects: list[CharityProjectsRead] = Field(
+        ..., title='Созданные или изменённые проекты'
+    )
+    donations: list[SuperUserDonationRead] = Field(
+        ..., title='Созданные или изменённые пожертвования'
+    )
+    next_cursor: str = Field(..., title='Курсор для следующего запроса')
+    has_more: bool = Field(..., title='Есть ли ещё изменения')
+
+    class Config:
+        title = 'Схема страницы ленты изменений'
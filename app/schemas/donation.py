@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, Field, PositiveInt, Extra
+from pydantic import BaseModel, Field, PositiveInt, Extra, validator
 
 from .union_schemas_attrs import UnionAttrsInSchemas
 
@@ -73,3 +73,32 @@ class SuperUserDonationRead(UserDonationsRead, UnionAttrsInSchemas):
                 'fully_invested': 0
             }
         }
+
+
+class DonationStatus(BaseModel):
+    """Схема статуса распределения пожертвования."""
+
+    id: int = Field(..., title='id пожертвования')
+    allocated_at: Optional[datetime] = Field(
+        None, title='Дата распределения'
+    )
+    allocated: bool = Field(False, title='Пожертвование распределено')
+    invested_amount: int = Field(..., title='Сколько вложено')
+    fully_invested: bool = Field(False, title='Вложена полная сумма')
+
+    class Config:
+        title = 'Схема статуса пожертвования'
+        orm_mode = True
+        schema_extra = {
+            'example': {
+                'id': 2,
+                'allocated_at': '2023-07-21T23:54:05.227Z',
+                'allocated': True,
+                'invested_amount': 200,
+                'fully_invested': False
+            }
+        }
+
+    @validator('allocated', always=True)
+    def allocated_from_date(cls, allocated: bool, values: dict):
+        return values.get('allocated_at') is not None
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class InvestmentRead(BaseModel):
+    """Схема перевода из пожертвования в проект."""
+
+    donation_id: int = Field(..., title='id пожертвования')
+    project_id: int = Field(..., title='id проекта')
+    amount: int = Field(..., title='Сумма перевода')
+    created_at: datetime = Field(..., title='Дата перевода')
+
+    class Config:
+        title = 'Схема перевода для получения'
+        orm_mode = True
+        schema_extra = {
+            'example': {
+                'donation_id': 2,
+                'project_id': 1,
+                'amount': 200,
+                'created_at': '2023-07-21T23:54:05.177Z'
+            }
+        }
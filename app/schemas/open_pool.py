@@ -0,0 +1,26 @@
+from pydantic import BaseModel, Field
+
+
+class OpenPoolRead(BaseModel):
+    """Схема итогов открытой очереди."""
+
+    projects_count: int = Field(..., title='Открытых проектов')
+    projects_remaining: int = Field(
+        ..., title='Осталось собрать на открытые проекты'
+    )
+    donations_count: int = Field(..., title='Нераспределённых пожертвований')
+    donations_remaining: int = Field(
+        ..., title='Нераспределённый остаток пожертвований'
+    )
+
+    class Config:
+        title = 'Схема итогов открытой очереди'
+        orm_mode = True
+        schema_extra = {
+            'example': {
+                'projects_count': 2,
+                'projects_remaining': 1500,
+                'donations_count': 0,
+                'donations_remaining': 0
+            }
+        }
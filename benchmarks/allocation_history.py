@@ -0,0 +1,96 @@
+"""
+Время распределения средств при растущей закрытой истории.
+
+Для каждого размера истории создаётся временная БД SQLite с закрытыми
+проектами и пожертвованиями, затем замеряется создание небольших
+пожертвований с распределением по единственному открытому проекту.
+Замер повторяется без индексов открытой очереди.
+
+Запуск: python -m benchmarks.allocation_history
+"""
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.base import Base
+from app.crud.donation import donation_crud
+from app.models import CharityProject, Donation
+
+HISTORY_SIZES = (0, 10_000, 100_000)
+DONATIONS = 200
+OPEN_POOL_INDEXES = (
+    'ix_charityproject_open_create_date',
+    'ix_donation_open_create_date',
+)
+
+
+async def fill_history(session: AsyncSession, history_size: int) -> None:
+    start = datetime(2020, 1, 1)
+    for model, extra in (
+        (CharityProject, lambda i: {'name': f'p{i}', 'description': 'd'}),
+        (Donation, lambda i: {}),
+    ):
+        if not history_size:
+            break
+        await session.execute(insert(model.__table__), [
+            {
+                'full_amount': 100,
+                'invested_amount': 100,
+                'fully_invested': True,
+                'create_date': start + timedelta(seconds=i),
+                'close_date': start + timedelta(seconds=i),
+                **extra(i),
+            }
+            for i in range(history_size)
+        ])
+    session.add(CharityProject(
+        name='open', description='open', full_amount=10 ** 9
+    ))
+    await session.commit()
+
+
+async def measure(history_size: int, with_indexes: bool) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}'
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            if not with_indexes:
+                for index in OPEN_POOL_INDEXES:
+                    await conn.execute(text(f'DROP INDEX {index}'))
+
+        session_factory = sessionmaker(engine, class_=AsyncSession)
+        async with session_factory() as session:
+            await fill_history(session, history_size)
+
+        async with session_factory() as session:
+            started = time.perf_counter()
+            for _ in range(DONATIONS):
+                donation = Donation(full_amount=10)
+                session.add(donation)
+                await session.commit()
+                await donation_crud.invest(donation, session)
+            elapsed = time.perf_counter() - started
+
+        await engine.dispose()
+
+    return elapsed / DONATIONS * 1000
+
+
+async def main() -> None:
+    print('история  с индексами, мс  без индексов, мс')
+    for history_size in HISTORY_SIZES:
+        indexed = await measure(history_size, with_indexes=True)
+        plain = await measure(history_size, with_indexes=False)
+        print(f'{history_size:>7}  {indexed:>16.2f}  {plain:>16.2f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""
+Загрузка большого числа проектов: по одному и одним пакетом.
+
+Сессии приложения (AsyncSessionLocal) перенаправляются во временную
+БД SQLite, запросы выполняются через TestClient от имени
+суперпользователя. Время загрузки по одному проекту оценивается
+по первым SINGLE_SAMPLE запросам.
+
+Запуск: python -m benchmarks.bulk_projects
+"""
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.constants import MAX_PROJECTS_BATCH_SIZE
+from app.core.base import Base
+from app.core.db import AsyncSessionLocal
+from app.core.project_names import project_name_index
+from app.core.user import current_superuser
+from app.main import app
+from app.models import User
+
+PROJECTS = MAX_PROJECTS_BATCH_SIZE
+SINGLE_SAMPLE = 500
+
+
+async def create_schema(engine, superuser: User) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    async with session_factory() as session:
+        session.add(superuser)
+        await session.commit()
+
+
+def measure(superuser: User, bulk: bool) -> float:
+    projects = [
+        {'name': f'p{number}', 'description': 'd', 'full_amount': 100}
+        for number in range(PROJECTS if bulk else SINGLE_SAMPLE)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}'
+        )
+        asyncio.run(create_schema(engine, superuser))
+        AsyncSessionLocal.configure(bind=engine)
+        project_name_index.clear()
+        client = TestClient(app)
+
+        started = time.perf_counter()
+        if bulk:
+            response = client.post('/charity_project/bulk', json=projects)
+            assert response.status_code == 200, response.text
+        else:
+            for project in projects:
+                client.post('/charity_project/', json=project)
+        elapsed = time.perf_counter() - started
+
+    return elapsed if bulk else elapsed / SINGLE_SAMPLE * PROJECTS
+
+
+def main() -> None:
+    superuser = User(
+        id=1,
+        email='bench@example.com',
+        hashed_password='-',
+        is_active=True,
+        is_superuser=True,
+        is_verified=True,
+    )
+    app.dependency_overrides = {current_superuser: lambda: superuser}
+    single = measure(superuser, bulk=False)
+    bulk = measure(superuser, bulk=True)
+    app.dependency_overrides = {}
+
+    print(f'{PROJECTS} проектов      время, с')
+    print(f'по одному (оценка) {single:>10.1f}')
+    print(f'одним пакетом      {bulk:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
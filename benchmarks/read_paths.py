@@ -0,0 +1,101 @@
+"""
+Пропускная способность чтения списка пожертвований.
+
+Во временной БД SQLite создаётся 100 000 пожертвований, затем список
+читается ORM объектами (CRUD.read_all) и строками колонок схемы
+(CRUD.read_rows). Замеряется только чтение и чтение вместе
+с построением ответа: через схему и jsonable_encoder, как делает
+response_model, или доверенными словарями с orjson.
+
+Запуск: python -m benchmarks.read_paths
+"""
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.responses import trusted_response
+from app.core.base import Base
+from app.crud.donation import donation_crud
+from app.models import Donation
+from app.schemas.donation import SuperUserDonationRead
+
+ROWS = 100_000
+REPEATS = 3
+
+
+async def read_orm(session: AsyncSession) -> list:
+    return await donation_crud.read_all(session)
+
+
+async def read_rows(session: AsyncSession) -> list:
+    return await donation_crud.read_rows(session, SuperUserDonationRead)
+
+
+def validated_body(donations: list) -> bytes:
+    return JSONResponse(jsonable_encoder(
+        [SuperUserDonationRead.from_orm(item) for item in donations],
+        exclude_none=True,
+    )).body
+
+
+def trusted_body(donations: list) -> bytes:
+    return trusted_response(donations, SuperUserDonationRead).body
+
+
+async def measure(session_factory, read, render=None) -> float:
+    best = float('inf')
+    for _ in range(REPEATS):
+        async with session_factory() as session:
+            started = time.perf_counter()
+            donations = await read(session)
+            if render is not None:
+                render(donations)
+            best = min(best, time.perf_counter() - started)
+    return ROWS / best
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}'
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            start = datetime(2020, 1, 1)
+            await conn.execute(insert(Donation.__table__), [
+                {
+                    'full_amount': 100,
+                    'invested_amount': 100,
+                    'fully_invested': True,
+                    'create_date': start + timedelta(seconds=i),
+                    'close_date': start + timedelta(seconds=i),
+                    'comment': 'comment',
+                    'user_id': 1,
+                }
+                for i in range(ROWS)
+            ])
+
+        session_factory = sessionmaker(engine, class_=AsyncSession)
+        print('путь                 чтение, строк/с  с ответом, строк/с')
+        for name, read, render in (
+            ('orm + схема', read_orm, validated_body),
+            ('колонки + схема', read_rows, validated_body),
+            ('колонки + orjson', read_rows, trusted_body),
+        ):
+            plain = await measure(session_factory, read)
+            full = await measure(session_factory, read, render)
+            print(f'{name:<18}  {plain:>15,.0f}  {full:>18,.0f}')
+
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""
+Пропускная способность создания пожертвований с профилем SQLite и без.
+
+Во временной БД SQLite с одним открытым проектом создаются
+пожертвования с распределением, каждое своим коммитом, как в
+POST /donation/. Замер выполняется на соединениях по умолчанию
+(журнал отката, synchronous=FULL, новое соединение на каждую сессию)
+и с профилем: пул соединений из engine_options и apply_sqlite_profile.
+Из нескольких повторов берётся лучший.
+
+Запуск: python -m benchmarks.sqlite_profile
+"""
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.base import Base
+from app.core.db import apply_sqlite_profile, engine_options
+from app.crud.donation import donation_crud
+from app.models import CharityProject, Donation
+
+DONATIONS = 500
+REPEATS = 3
+
+
+async def measure(with_profile: bool) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}'
+        if with_profile:
+            engine = create_async_engine(
+                database_url, **engine_options(database_url)
+            )
+            apply_sqlite_profile(engine)
+        else:
+            engine = create_async_engine(database_url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        session_factory = sessionmaker(engine, class_=AsyncSession)
+        async with session_factory() as session:
+            session.add(CharityProject(
+                name='open', description='open', full_amount=10 ** 9
+            ))
+            await session.commit()
+
+        started = time.perf_counter()
+        for _ in range(DONATIONS):
+            async with session_factory() as session:
+                await donation_crud.invest(Donation(full_amount=10), session)
+        elapsed = time.perf_counter() - started
+
+        await engine.dispose()
+
+    return DONATIONS / elapsed
+
+
+async def main() -> None:
+    plain = max([await measure(False) for _ in range(REPEATS)])
+    profiled = max([await measure(True) for _ in range(REPEATS)])
+    print('режим           пожертвований/с')
+    print(f'по умолчанию    {plain:>15.0f}')
+    print(f'профиль SQLite  {profiled:>15.0f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Число SQL запросов на запрос к пишущим эндпоинтам.
+
+Сессии приложения (AsyncSessionLocal) перенаправляются во временную
+БД SQLite, запросы выполняются через TestClient от имени
+суперпользователя.
+Считаются все выполненные курсором команды, кроме BEGIN и COMMIT.
+
+Запуск: python -m benchmarks.write_queries
+"""
+import asyncio
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.base import Base
+from app.core.db import AsyncSessionLocal
+from app.core.user import current_superuser, current_user
+from app.main import app
+from app.models import User
+
+REQUESTS = 20
+
+
+async def create_schema(engine, superuser: User) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    async with session_factory() as session:
+        session.add(superuser)
+        await session.commit()
+
+
+def main() -> None:
+    superuser = User(
+        id=1,
+        email='bench@example.com',
+        hashed_password='-',
+        is_active=True,
+        is_superuser=True,
+        is_verified=True,
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{Path(tmp) / "bench.db"}'
+        )
+        asyncio.run(create_schema(engine, superuser))
+        AsyncSessionLocal.configure(bind=engine)
+
+        statements = []
+        event.listen(
+            engine.sync_engine, 'before_cursor_execute',
+            lambda *args: statements.append(args[2])
+        )
+        app.dependency_overrides = {
+            current_superuser: lambda: superuser,
+            current_user: lambda: superuser,
+        }
+        client = TestClient(app)
+        counts = defaultdict(int)
+
+        def count(name, method, url, **kwargs):
+            statements.clear()
+            response = getattr(client, method)(url, **kwargs)
+            counts[name] += len(statements)
+            return response.json()
+
+        for number in range(REQUESTS):
+            project = count(
+                'POST /charity_project/', 'post', '/charity_project/',
+                json={
+                    'name': f'p{number}', 'description': 'd',
+                    'full_amount': 100,
+                }
+            )
+            count(
+                'PATCH /charity_project/{id}', 'patch',
+                f'/charity_project/{project["id"]}',
+                json={'description': 'new'}
+            )
+            count(
+                'POST /donation/', 'post', '/donation/',
+                json={'full_amount': 50}
+            )
+        app.dependency_overrides = {}
+
+    print('запрос                        SQL на запрос')
+    for name, total in counts.items():
+        print(f'{name:<30}{total / REQUESTS:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,14 @@
+import os
 from pathlib import Path
 
 import pytest
 import pytest_asyncio
 from mixer.backend.sqlalchemy import Mixer as _mixer
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 try:
     from app.main import app  # noqa
@@ -16,7 +19,7 @@ except (NameError, ImportError) as error:
     )
 
 try:
-    from app.core.db import Base, get_async_session  # noqa
+    from app.core.db import Base, engine_options, get_async_session  # noqa
 except (NameError, ImportError) as error:
     raise AssertionError(
         'При импорте объектов `Base, get_async_session` '
@@ -51,13 +54,39 @@ pytest_plugins = [
 ]
 
 TEST_DB = BASE_DIR / 'test.db'
-SQLALCHEMY_DATABASE_URL = f'sqlite+aiosqlite:///{str(TEST_DB)}'
+# Другая БД для прогона, например postgresql+asyncpg://.../test,
+# набор на PostgreSQL запускается командой make test-postgres.
+SQLALCHEMY_DATABASE_URL = os.environ.get(
+    'TEST_DATABASE_URL', f'sqlite+aiosqlite:///{str(TEST_DB)}'
+)
+DATABASE_BACKEND = make_url(SQLALCHEMY_DATABASE_URL).get_backend_name()
+
+
+def test_engine_options(database_url: str) -> dict:
+    """
+    Параметры тестового движка.
+
+    Клиент тестов выполняет запросы в своём цикле событий,
+    а соединения asyncpg привязаны к циклу, в котором созданы,
+    поэтому для PostgreSQL пул не используется. Параметры драйвера,
+    в том числе statement_timeout, берутся из engine_options.
+    """
+
+    if DATABASE_BACKEND == 'sqlite':
+        return {'connect_args': {'check_same_thread': False}}
+
+    return {
+        'connect_args': engine_options(database_url).get('connect_args', {}),
+        'poolclass': NullPool,
+    }
+
+
 engine = create_async_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={'check_same_thread': False},
+    SQLALCHEMY_DATABASE_URL, **test_engine_options(SQLALCHEMY_DATABASE_URL)
 )
 TestingSessionLocal = sessionmaker(
     class_=AsyncSession, autocommit=False, autoflush=False, bind=engine,
+    expire_on_commit=False,
 )
 
 
@@ -66,10 +95,40 @@ async def override_db():
         yield session
 
 
+async def create_fixture_users(conn) -> None:
+    """
+    Запись пользователей фикстур в БД.
+
+    Пожертвования фикстур ссылаются на них внешним ключом,
+    который PostgreSQL проверяет.
+    """
+
+    from fixtures.user import User, not_auth_user, superuser, user
+
+    users = (superuser, user, not_auth_user)
+    await conn.execute(insert(User.__table__), [
+        {
+            'id': fixture_user.id,
+            'email': f'user{fixture_user.id}@example.com',
+            'hashed_password': '',
+            'is_active': fixture_user.is_active,
+            'is_superuser': fixture_user.is_superuser,
+            'is_verified': fixture_user.is_verified,
+        }
+        for fixture_user in users
+    ])
+    if DATABASE_BACKEND == 'postgresql':
+        await conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('\"user\"', 'id'), "
+            '(SELECT max(id) FROM "user"))'
+        ))
+
+
 @pytest_asyncio.fixture(autouse=True)
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await create_fixture_users(conn)
     yield
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
@@ -77,6 +136,8 @@ async def init_db():
 
 @pytest.fixture
 def mixer():
-    mixer_engine = create_engine(f'sqlite:///{str(TEST_DB)}')
+    mixer_engine = create_engine(
+        make_url(SQLALCHEMY_DATABASE_URL).set(drivername=DATABASE_BACKEND)
+    )
     session = sessionmaker(bind=mixer_engine)
     return _mixer(session=session(), commit=True)
@@ -1,10 +1,21 @@
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import pytest
+from conftest import TestingSessionLocal, engine
+from sqlalchemy import event, select, update
+
+from app.api.validators import ProjectLoader
+from app.core.project_names import project_name_index
+from app.core.read_your_writes import read_your_writes
+from app.core.response_cache import project_list_cache
+from app.crud.charity_project import charity_project_crud
+from app.crud.donation import donation_crud
+from app.models import CharityProject
 
 PROJECTS_URL = '/charity_project/'
 PROJECT_DETAILS_URL = PROJECTS_URL + '{project_id}'
+PROJECTS_BULK_URL = PROJECTS_URL + 'bulk'
 
 
 @pytest.mark.parametrize(
@@ -728,3 +739,380 @@ def test_get_all_charity_project_not_auth_user(test_client):
         f'пользователя к эндпоинту `{PROJECTS_URL}` возвращается список '
         'существующих проектов.'
     )
+
+
+@pytest.mark.usefixtures('charity_project_nunchaku', 'closed_charity_project')
+def test_get_charity_projects_filtered(superuser_client):
+    response = superuser_client.get(
+        PROJECTS_URL, params={'fully_invested': False}
+    )
+    assert [project['fully_invested'] for project in response.json()] == [
+        False
+    ], (
+        'Фильтр `fully_invested` должен возвращать только проекты '
+        'с указанным состоянием.'
+    )
+    response = superuser_client.get(
+        PROJECTS_URL, params={'limit': 1, 'fully_invested': True}
+    )
+    assert 'X-Next-Cursor' in response.headers, (
+        'Если страница заполнена целиком, в ответе должен быть '
+        'заголовок `X-Next-Cursor`.'
+    )
+
+
+@pytest.fixture
+def count_statements():
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', count_statement
+    )
+    yield statements
+    event.remove(
+        engine.sync_engine, 'before_cursor_execute', count_statement
+    )
+    project_name_index.clear()
+
+
+async def test_project_loader_single_query(
+    charity_project, charity_project_nunchaku, count_statements
+):
+    async with TestingSessionLocal() as session:
+        await project_name_index.ensure_loaded(session)
+        count_statements.clear()
+
+        loader = ProjectLoader(session)
+        await loader.load(charity_project.id, charity_project_nunchaku.name)
+        project = await loader.get(charity_project.id)
+        name_taken = await loader.name_taken(charity_project_nunchaku.name)
+        own_name_taken = await loader.name_taken(charity_project.name)
+    assert project.id == charity_project.id, (
+        'Загрузчик должен возвращать проект по id.'
+    )
+    assert name_taken and own_name_taken, (
+        'Загрузчик должен отмечать имена, занятые любым проектом.'
+    )
+    assert len(count_statements) == 1, (
+        'Проект и занятость имени должны читаться одним запросом, '
+        'повторные проверки должны использовать загруженный результат.'
+    )
+
+
+async def test_free_name_checked_without_query(
+    charity_project, count_statements
+):
+    async with TestingSessionLocal() as session:
+        await project_name_index.ensure_loaded(session)
+        count_statements.clear()
+
+        name_taken = await ProjectLoader(session).name_taken('new name')
+    assert not name_taken and not count_statements, (
+        'Имя, отсутствующее в индексе имён, должно считаться свободным '
+        'без запроса к БД.'
+    )
+
+
+def test_create_project_name_taken_bypassing_index(superuser_client, mixer):
+    superuser_client.post(PROJECTS_URL, json={
+        'name': 'first', 'description': 'first', 'full_amount': 100,
+    })
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='bypass',
+        description='bypass',
+        full_amount=100,
+        create_date=datetime.now(),
+    )
+    response = superuser_client.post(PROJECTS_URL, json={
+        'name': 'bypass', 'description': 'second', 'full_amount': 100,
+    })
+    assert response.status_code == 400, (
+        'При нарушении уникальности имени в БД '
+        'должен возвращаться статус-код 400.'
+    )
+    assert response.json() == {
+        'detail': 'Проект с таким именем уже существует!'
+    }, (
+        'Ошибка уникальности имени в БД должна возвращаться с тем же '
+        'сообщением, что и проверка имени.'
+    )
+
+
+def test_get_all_charity_projects_cached(superuser_client, charity_project):
+    project_list_cache.clear()
+    first = superuser_client.get(PROJECTS_URL)
+    second = superuser_client.get(PROJECTS_URL)
+    assert first.json() == second.json(), (
+        'Ответ из кэша должен совпадать с ответом, собранным по БД.'
+    )
+    assert (project_list_cache.hits, project_list_cache.misses) == (1, 1), (
+        'Повторный запрос списка проектов без изменений '
+        'должен отдаваться из кэша.'
+    )
+    superuser_client.post(PROJECTS_URL, json={
+        'name': 'new', 'description': 'new', 'full_amount': 100,
+    })
+    response = superuser_client.get(PROJECTS_URL)
+    assert len(response.json()) == 2, (
+        'После создания проекта кэш списка проектов '
+        'не должен отдавать устаревший ответ.'
+    )
+
+
+def test_get_all_charity_projects_not_modified(
+    superuser_client, charity_project
+):
+    response = superuser_client.get(PROJECTS_URL)
+    etag = response.headers.get('ETag')
+    assert etag, 'Список проектов должен возвращаться с заголовком `ETag`.'
+    response = superuser_client.get(
+        PROJECTS_URL, headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 304 and not response.content, (
+        'Запрос списка проектов с актуальным `If-None-Match` '
+        'должен возвращать статус-код 304 без тела.'
+    )
+    superuser_client.post(PROJECTS_URL, json={
+        'name': 'new', 'description': 'new', 'full_amount': 100,
+    })
+    response = superuser_client.get(
+        PROJECTS_URL, headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 200, (
+        'После изменения проектов старый `ETag` не должен '
+        'приводить к ответу 304.'
+    )
+    assert response.headers['ETag'] != etag, (
+        'После изменения проектов `ETag` списка должен меняться.'
+    )
+
+
+async def test_projects_by_completion_rate(mixer):
+    for name, days in (('slow', 30), ('fast', 1), ('open', None)):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=name,
+            description=name,
+            full_amount=100,
+            invested_amount=100 if days else 0,
+            fully_invested=days is not None,
+            create_date=datetime(2020, 1, 1),
+            close_date=datetime(2020, 1, 1) + timedelta(days=days or 0),
+        )
+    async with TestingSessionLocal() as session:
+        projects = await charity_project_crud.get_projects_by_completion_rate(
+            session
+        )
+    assert [project.name for project in projects] == ['fast', 'slow'], (
+        'Закрытые проекты должны сортироваться по времени сбора средств.'
+    )
+
+
+def test_reads_routed_to_replica_except_after_write(
+    superuser_client, monkeypatch
+):
+    replica_sessions = []
+
+    def replica_session():
+        replica_sessions.append(True)
+        return TestingSessionLocal()
+
+    monkeypatch.setattr('app.core.db.ReadSessionLocal', replica_session)
+    read_your_writes.clear()
+    headers = {'Authorization': 'Bearer writer'}
+    superuser_client.get(PROJECTS_URL, headers=headers)
+    assert len(replica_sessions) == 1, (
+        'Если задана реплика, список проектов должен читаться из неё.'
+    )
+    superuser_client.post(PROJECTS_URL, headers=headers, json={
+        'name': 'new', 'description': 'new', 'full_amount': 100,
+    })
+    response = superuser_client.get(PROJECTS_URL, headers=headers)
+    assert len(response.json()) == 1 and len(replica_sessions) == 1, (
+        'Сразу после записи чтения клиента должны идти в основную БД.'
+    )
+    superuser_client.get(PROJECTS_URL)
+    assert len(replica_sessions) == 2, (
+        'Чтения других клиентов должны по-прежнему идти в реплику.'
+    )
+
+
+def test_create_charity_projects_bulk(superuser_client, mixer):
+    mixer.blend(
+        'app.models.donation.Donation',
+        user_id=2,
+        full_amount=100,
+        create_date=datetime.now(),
+    )
+    response = superuser_client.post(PROJECTS_BULK_URL, json=[
+        {'name': f'bulk {number}', 'description': 'bulk', 'full_amount': 60}
+        for number in range(3)
+    ])
+    assert response.status_code == 200, (
+        f'Корректный POST-запрос суперюзера к эндпоинту `{PROJECTS_BULK_URL}` '
+        'должен вернуть ответ со статус-кодом 200.'
+    )
+    response_data = response.json()
+    assert [project['name'] for project in response_data] == [
+        'bulk 0', 'bulk 1', 'bulk 2'
+    ], (
+        f'Ответ на POST-запрос к эндпоинту `{PROJECTS_BULK_URL}` должен '
+        'содержать созданные проекты в порядке их передачи.'
+    )
+    assert [
+        (project['invested_amount'], project['fully_invested'])
+        for project in response_data
+    ] == [(60, True), (40, False), (0, False)], (
+        'Ожидающие пожертвования должны распределяться '
+        'по проектам пакета в порядке их передачи.'
+    )
+    projects = superuser_client.get(PROJECTS_URL).json()
+    assert {
+        project['id']: project['name'] for project in projects
+    } == {project['id']: project['name'] for project in response_data}, (
+        'Проекты пакета должны сохраняться в БД с теми же `id`, '
+        'что и в ответе.'
+    )
+
+
+@pytest.mark.parametrize('names', [
+    ['twin', 'twin'],
+    ['new', 'chimichangas'],
+])
+def test_create_charity_projects_bulk_name_taken(
+    superuser_client, mixer, names
+):
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='chimichangas',
+        description='chimichangas',
+        full_amount=100,
+        create_date=datetime.now(),
+    )
+    response = superuser_client.post(PROJECTS_BULK_URL, json=[
+        {'name': name, 'description': 'bulk', 'full_amount': 100}
+        for name in names
+    ])
+    assert response.status_code == 400, (
+        'Пакет с повторяющимся или уже занятым именем '
+        'должен отклоняться со статус-кодом 400.'
+    )
+    assert len(superuser_client.get(PROJECTS_URL).json()) == 1, (
+        'При ошибке в пакете проекты не должны создаваться.'
+    )
+
+
+def test_create_charity_projects_bulk_usual_user(user_client):
+    response = user_client.post(PROJECTS_BULK_URL, json=[
+        {'name': 'bulk', 'description': 'bulk', 'full_amount': 100}
+    ])
+    assert response.status_code == 403, (
+        'POST-запрос пользователя, не являющегося суперюзером, к эндпоинту '
+        f'`{PROJECTS_BULK_URL}` должен вернуть статус-код 403.'
+    )
+
+
+async def test_bulk_operations_in_chunks(monkeypatch, count_statements):
+    monkeypatch.setattr('app.core.config.settings.bulk_chunk_size', 2)
+    async with TestingSessionLocal() as session:
+        projects = await charity_project_crud.bulk_create(
+            [
+                CharityProject(
+                    name=f'bulk {number}', description='bulk', full_amount=10
+                )
+                for number in range(5)
+            ],
+            session
+        )
+        inserts = [
+            statement for statement in count_statements
+            if statement.startswith('INSERT INTO charityproject')
+        ]
+        updated = await charity_project_crud.bulk_update(
+            [
+                {'id': project.id, 'description': f'updated {project.name}'}
+                for project in projects
+            ],
+            session
+        )
+        deleted = await charity_project_crud.bulk_delete(
+            [project.id for project in projects[:3]], session
+        )
+        rows = await session.execute(
+            select(CharityProject.id, CharityProject.description)
+            .order_by(CharityProject.id)
+        )
+    assert len(inserts) == 3, (
+        'Записи должны вставляться порциями по `bulk_chunk_size`.'
+    )
+    assert updated == 5 and deleted == 3, (
+        'Пакетные обновление и удаление должны возвращать '
+        'число затронутых строк.'
+    )
+    assert rows.all() == [
+        (project.id, f'updated {project.name}') for project in projects[3:]
+    ], (
+        'Записям должны назначаться `id` вставленных строк, пакетное '
+        'обновление и удаление должны затрагивать записи по `id`.'
+    )
+
+
+@pytest.mark.parametrize('invested, new_data, detail', [
+    (
+        85,
+        {'full_amount': 50},
+        'Нельзя установить значение full_amount меньше уже вложенной суммы.',
+    ),
+    (
+        100,
+        {'description': 'new'},
+        'Закрытый проект нельзя редактировать!',
+    ),
+])
+def test_update_charity_project_invested_while_queued(
+    superuser_client, mixer, monkeypatch, invested, new_data, detail
+):
+    project = mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='queued',
+        description='queued',
+        full_amount=100,
+        create_date=datetime.now(),
+    )
+    reinvest = donation_crud._reinvest
+
+    async def invest_before_job(*args, **kwargs):
+        async with TestingSessionLocal() as session:
+            await session.execute(
+                update(CharityProject).where(
+                    CharityProject.id == project.id
+                ).values(
+                    invested_amount=invested,
+                    fully_invested=invested == 100,
+                    close_date=datetime.now() if invested == 100 else None,
+                )
+            )
+            await session.commit()
+        return await reinvest(*args, **kwargs)
+
+    monkeypatch.setattr(donation_crud, '_reinvest', invest_before_job)
+    response = superuser_client.patch(
+        PROJECT_DETAILS_URL.format(project_id=project.id), json=new_data
+    )
+    assert response.status_code == 400, (
+        'Если проект довложили или закрыли, пока PATCH-запрос ждал '
+        'очереди распределения, проверки должны повторяться '
+        'и запрос должен отклоняться со статус-кодом 400.'
+    )
+    assert response.json() == {'detail': detail}, (
+        'Повторная проверка должна возвращать то же сообщение, '
+        'что и проверка до постановки в очередь.'
+    )
+    saved = superuser_client.get(PROJECTS_URL).json()[0]
+    assert (saved['full_amount'], saved['description']) == (100, 'queued'), (
+        'Отклонённое изменение не должно сохраняться в БД.'
+    )
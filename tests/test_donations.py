@@ -1,7 +1,13 @@
+import json
 import time
 from datetime import datetime
 
 import pytest
+from conftest import TestingSessionLocal, app, current_user
+from fixtures.user import superuser
+
+from app.crud.donation import donation_crud
+from app.schemas.donation import UserDonationsRead
 
 DONATIONS_URL = '/donation/'
 DONATON_DETAILS_URL = DONATIONS_URL + '{donation_id}'
@@ -221,3 +227,160 @@ def test_create_donation_check_create_date(user_client):
         'Убедитесь, что при неодновременном создании двух пожертвований '
         'у них отличаются значения в поле `create_date`.'
     )
+
+
+def test_create_donations_batch(user_client, charity_project_little_invested):
+    batch_url = DONATIONS_URL + 'batch'
+    response = user_client.post(batch_url, json=[
+        {'full_amount': 999000, 'comment': 'first'},
+        {'full_amount': 1000},
+        {'full_amount': 500},
+    ])
+    assert response.status_code == 200, (
+        f'Корректный POST-запрос к эндпоинту `{batch_url}` '
+        'должен вернуть ответ со статус-кодом 200.'
+    )
+    response_data = response.json()
+    assert [
+        (donation['full_amount'], donation.get('comment'))
+        for donation in response_data
+    ] == [(999000, 'first'), (1000, None), (500, None)], (
+        f'Ответ на POST-запрос к эндпоинту `{batch_url}` должен содержать '
+        'созданные пожертвования в порядке их передачи.'
+    )
+    assert len({donation['id'] for donation in response_data}) == 3, (
+        'Каждое пожертвование пакета должно получить собственный `id`.'
+    )
+    assert charity_project_little_invested.fully_invested, (
+        'Пожертвования пакета должны распределяться по открытым проектам.'
+    )
+    assert len(user_client.get(MY_DONATIONS_URL).json()) == 3, (
+        'Пожертвования пакета должны сохраняться в БД.'
+    )
+
+
+@pytest.mark.parametrize('json_data', [[], [{'full_amount': -1}]])
+def test_create_donations_batch_invalid(user_client, json_data):
+    response = user_client.post(DONATIONS_URL + 'batch', json=json_data)
+    assert response.status_code == 422, (
+        'Пустой пакет или пакет с некорректным пожертвованием '
+        'должен отклоняться со статус-кодом 422.'
+    )
+
+
+def test_get_all_donations_paginated(superuser_client):
+    app.dependency_overrides[current_user] = lambda: superuser
+    for full_amount in (10, 20, 30, 40, 50):
+        superuser_client.post(DONATIONS_URL, json={'full_amount': full_amount})
+    pages, cursor = [], None
+    while True:
+        params = {'limit': 2}
+        if cursor:
+            params['after'] = cursor
+        response = superuser_client.get(DONATIONS_URL, params=params)
+        pages.append([donation['full_amount'] for donation in response.json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert pages == [[10, 20], [30, 40], [50]], (
+        'GET-запрос с параметром `limit` должен возвращать страницы '
+        'в порядке создания, курсор следующей страницы - '
+        'в заголовке `X-Next-Cursor`.'
+    )
+    response = superuser_client.get(
+        DONATIONS_URL, params={'min_amount': 20, 'max_amount': 40}
+    )
+    assert [
+        donation['full_amount'] for donation in response.json()
+    ] == [20, 30, 40], (
+        'Фильтры `min_amount` и `max_amount` должны ограничивать '
+        'сумму пожертвования.'
+    )
+    response = superuser_client.get(DONATIONS_URL, params={'after': 'bad'})
+    assert response.status_code == 400, (
+        'Некорректный курсор должен возвращать статус-код 400.'
+    )
+
+
+@pytest.mark.parametrize('stream_format', ('ndjson', 'json'))
+def test_get_all_donations_stream(superuser_client, stream_format):
+    app.dependency_overrides[current_user] = lambda: superuser
+    for full_amount in (10, 20, 30):
+        superuser_client.post(
+            DONATIONS_URL, json={'full_amount': full_amount, 'comment': 'x'}
+        )
+    expected = superuser_client.get(DONATIONS_URL).json()
+    response = superuser_client.get(
+        DONATIONS_URL, params={'stream': stream_format}
+    )
+    if stream_format == 'ndjson':
+        data = [json.loads(line) for line in response.text.splitlines()]
+    else:
+        data = response.json()
+    assert data == expected, (
+        'Потоковая выгрузка пожертвований должна содержать '
+        'те же данные, что и обычный ответ.'
+    )
+
+
+def test_get_all_donations_stream_empty(superuser_client):
+    response = superuser_client.get(DONATIONS_URL, params={'stream': 'json'})
+    assert response.json() == [], (
+        'Потоковая выгрузка пустого списка в формате json '
+        'должна возвращать пустой массив.'
+    )
+
+
+@pytest.mark.usefixtures('donation')
+async def test_read_rows_skips_orm_hydration():
+    async with TestingSessionLocal() as session:
+        rows = await donation_crud.read_rows(session, UserDonationsRead)
+        assert len(rows) == 1 and not session.identity_map, (
+            'Метод `read_rows` должен читать колонки схемы '
+            'без создания ORM объектов.'
+        )
+        assert set(rows[0]._fields) == {
+            'id', 'full_amount', 'comment', 'create_date'
+        }, 'Метод `read_rows` должен выбирать только колонки схемы ответа.'
+
+
+def test_my_donations_trusted_response(user_client, donation):
+    response = user_client.get(MY_DONATIONS_URL)
+    assert response.json() == [{
+        'id': donation.id,
+        'full_amount': 100,
+        'comment': 'To you for chimichangas',
+        'create_date': '2011-11-11T00:00:00',
+    }], (
+        'Ответ без повторной валидации должен содержать ровно '
+        'поля схемы `UserDonationsRead`.'
+    )
+    schema = app.openapi()['paths']['/donation/my']['get']['responses']
+    assert schema['200']['content']['application/json']['schema'][
+        'items'
+    ] == {'$ref': '#/components/schemas/UserDonationsRead'}, (
+        'Схема ответа в OpenAPI должна остаться прежней.'
+    )
+
+
+def test_my_donations_not_modified(user_client, donation):
+    etag = user_client.get(MY_DONATIONS_URL).headers.get('ETag')
+    assert etag, (
+        'Список пожертвований пользователя должен возвращаться '
+        'с заголовком `ETag`.'
+    )
+    response = user_client.get(
+        MY_DONATIONS_URL, headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 304, (
+        'Запрос списка пожертвований с актуальным `If-None-Match` '
+        'должен возвращать статус-код 304.'
+    )
+    user_client.post(DONATIONS_URL, json={'full_amount': 10})
+    response = user_client.get(
+        MY_DONATIONS_URL, headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 200 and len(response.json()) == 2, (
+        'После нового пожертвования пользователя старый `ETag` '
+        'не должен приводить к ответу 304.'
+    )
@@ -1,7 +1,24 @@
+import asyncio
+
 import pytest
+from conftest import TestingSessionLocal, app, current_user, engine
+from fixtures.user import superuser
+
+from sqlalchemy import event, select
+
+from app.core.allocation import allocate, transfers
+from app.core.allocation_queue import allocation_queue
+from app.core.deferred_allocation import deferred_allocation
+from app.core.order_book import order_book
+from app.crud.charity_project import charity_project_crud
+from app.crud.donation import donation_crud
+from app.crud.open_pool import open_pool_crud
+from app.models import CharityProject, Donation, Investment
+from app.schemas.charity_project import CharityProjectsUpdate
 
 DONATION_URL = '/donation/'
 PROJECTS_URL = '/charity_project/'
+CHANGES_URL = '/changes/'
 
 
 @pytest.mark.usefixtures('donation')
@@ -60,3 +77,688 @@ def test_donation_to_little_invest_project(
     )
     assert not charity_project_nunchaku.fully_invested, common_asser_msg
     assert charity_project_nunchaku.invested_amount == 0, common_asser_msg
+
+
+@pytest.mark.parametrize('funds, open_items, expected', [
+    ([50], [], ([0], [], [], [])),
+    ([50], [100, 200], ([50], [50], [0], [])),
+    ([100], [100, 200], ([100], [100, 0], [0], [0])),
+    ([250], [100, 200], ([250], [100, 150], [0], [0])),
+    ([500], [100, 200], ([300], [100, 200], [], [0, 1])),
+    ([100, 250, 50], [300], ([100, 200], [300], [0], [0])),
+])
+def test_allocate(funds, open_items, expected):
+    assert tuple(allocate(funds, open_items)) == expected, (
+        'Функция `allocate` должна возвращать приращения `invested_amount` '
+        'и индексы закрытых записей по правилу FIFO.'
+    )
+
+
+@pytest.mark.parametrize('funds, open_items, expected', [
+    ([50], [], []),
+    ([500], [100, 200], [(0, 0, 100), (0, 1, 200)]),
+    ([100, 250, 50], [300], [(0, 0, 100), (1, 0, 200)]),
+    ([0, 50], [20, 0, 30], [(1, 0, 20), (1, 2, 30)]),
+])
+def test_transfers(funds, open_items, expected):
+    assert transfers(allocate(funds, open_items)) == expected, (
+        'Функция `transfers` должна возвращать переводы '
+        '(индекс средств, индекс открытой записи, сумма) '
+        'в порядке распределения.'
+    )
+
+
+@pytest.mark.parametrize('allocation_engine, chunk_size', [
+    ('orm', 100),
+    ('orm', 1),
+    ('sql', 100),
+])
+def test_allocation_engines_give_same_result(
+        superuser_client, monkeypatch, allocation_engine, chunk_size
+):
+    monkeypatch.setattr(
+        'app.core.config.settings.allocation_engine', allocation_engine
+    )
+    monkeypatch.setattr('app.crud.allocation.OPEN_POOL_CHUNK_SIZE', chunk_size)
+    app.dependency_overrides[current_user] = lambda: superuser
+    for full_amount in (100, 250, 50):
+        superuser_client.post(DONATION_URL, json={'full_amount': full_amount})
+    superuser_client.post(PROJECTS_URL, json={
+        'name': 'first', 'description': 'first', 'full_amount': 300,
+    })
+    superuser_client.post(PROJECTS_URL, json={
+        'name': 'second', 'description': 'second', 'full_amount': 500,
+    })
+    superuser_client.post(DONATION_URL, json={'full_amount': 400})
+    common_asser_msg = (
+        'Движки распределения средств `orm` и `sql` должны давать '
+        'одинаковый результат.'
+    )
+    projects = superuser_client.get(PROJECTS_URL).json()
+    assert [
+        (project['invested_amount'], project['fully_invested'])
+        for project in projects
+    ] == [(300, True), (500, True)], common_asser_msg
+    donations = superuser_client.get(DONATION_URL).json()
+    assert [
+        (donation['invested_amount'], donation['fully_invested'])
+        for donation in donations
+    ] == [
+        (100, True), (250, True), (50, True), (400, True)
+    ], common_asser_msg
+
+
+async def test_concurrent_allocations_do_not_lose_updates():
+    async with TestingSessionLocal() as session:
+        project = CharityProject(
+            name='queue', description='queue', full_amount=1000
+        )
+        session.add(project)
+        await session.commit()
+        await session.refresh(project)
+        project_id = project.id
+
+    async def donate(full_amount):
+        async with TestingSessionLocal() as session:
+            donation = Donation(full_amount=full_amount)
+            session.add(donation)
+            await session.commit()
+            await donation_crud.invest(donation, session)
+
+    allocation_queue.start()
+    try:
+        await asyncio.gather(*(donate(100) for _ in range(5)))
+    finally:
+        await allocation_queue.stop()
+
+    async with TestingSessionLocal() as session:
+        project = await session.get(CharityProject, project_id)
+    assert project.invested_amount == 500, (
+        'Одновременные пожертвования должны распределяться последовательно, '
+        'без потери обновлений `invested_amount`.'
+    )
+
+
+async def test_order_book_matches_allocation_engines(monkeypatch):
+    monkeypatch.setattr('app.core.config.settings.allocation_engine', 'memory')
+
+    async def create(session, model, **data):
+        funds = model(**data)
+        session.add(funds)
+        await session.commit()
+        await session.refresh(funds)
+        await donation_crud.invest(funds, session)
+
+    try:
+        async with TestingSessionLocal() as session:
+            for full_amount in (100, 250, 50):
+                await create(session, Donation, full_amount=full_amount)
+            await create(
+                session, CharityProject,
+                name='first', description='first', full_amount=300
+            )
+            await create(
+                session, CharityProject,
+                name='second', description='second', full_amount=500
+            )
+            await create(session, Donation, full_amount=400)
+            await order_book.flush(session)
+            assert await order_book.check_consistency(session) == [], (
+                'После записи книги заявок в БД расхождений быть не должно.'
+            )
+            projects = await session.execute(
+                select(
+                    CharityProject.invested_amount,
+                    CharityProject.fully_invested
+                ).order_by(CharityProject.id)
+            )
+            assert projects.all() == [(300, True), (500, True)], (
+                'Книга заявок должна распределять средства так же, '
+                'как движки `orm` и `sql`.'
+            )
+            ledger = await session.execute(
+                select(
+                    Investment.donation_id,
+                    Investment.project_id,
+                    Investment.amount,
+                ).order_by(Investment.id)
+            )
+            assert ledger.all() == [
+                (1, 1, 100), (2, 1, 200), (2, 2, 50), (3, 2, 50),
+                (4, 2, 400),
+            ], (
+                'Книга заявок должна записывать переводы '
+                'в журнал при записи в БД.'
+            )
+    finally:
+        await order_book.stop(TestingSessionLocal)
+
+
+async def test_order_book_recovers_from_unsettled_tables():
+    async with TestingSessionLocal() as session:
+        session.add_all([
+            CharityProject(name='open', description='open', full_amount=300),
+            Donation(full_amount=200),
+            Donation(full_amount=200),
+        ])
+        await session.commit()
+
+    try:
+        await order_book.start(TestingSessionLocal, flush_interval=60)
+        async with TestingSessionLocal() as session:
+            await order_book.flush(session)
+            donations = await session.execute(
+                select(Donation.invested_amount).order_by(Donation.id)
+            )
+            assert donations.scalars().all() == [200, 100], (
+                'При восстановлении из БД открытые проекты и пожертвования '
+                'должны сводиться между собой.'
+            )
+            assert await order_book.check_consistency(session) == [], (
+                'После восстановления книга заявок должна совпадать с БД.'
+            )
+    finally:
+        await order_book.stop(TestingSessionLocal)
+
+
+async def test_order_book_sync_keeps_invested_amount(monkeypatch):
+    monkeypatch.setattr('app.core.config.settings.allocation_engine', 'memory')
+    try:
+        async with TestingSessionLocal() as session:
+            project = CharityProject(
+                name='open', description='open', full_amount=100
+            )
+            session.add(project)
+            await session.commit()
+            await donation_crud.invest(project, session)
+            await donation_crud.invest(Donation(full_amount=30), session)
+
+        order_book.sync(CharityProject(
+            id=project.id,
+            full_amount=150,
+            invested_amount=0,
+            fully_invested=False,
+        ))
+        record = order_book.queues[CharityProject][0]
+        assert (record.full_amount, record.invested_amount) == (150, 30), (
+            'Перенос изменений проекта в книгу заявок должен обновлять '
+            '`full_amount`, но не `invested_amount`, который ведёт книга.'
+        )
+    finally:
+        await order_book.stop(TestingSessionLocal)
+
+
+async def test_order_book_patch_and_invest_serialized(monkeypatch):
+    monkeypatch.setattr('app.core.config.settings.allocation_engine', 'memory')
+    allocation_queue.start()
+    try:
+        async with TestingSessionLocal() as session:
+            project = CharityProject(
+                name='open', description='open', full_amount=100
+            )
+            session.add(project)
+            await session.commit()
+            await donation_crud.invest(project, session)
+
+        async with TestingSessionLocal() as patch_session, \
+                TestingSessionLocal() as invest_session:
+            project = await patch_session.get(CharityProject, project.id)
+            await asyncio.gather(
+                donation_crud.reinvest(
+                    project,
+                    CharityProjectsUpdate(description='new'),
+                    patch_session
+                ),
+                donation_crud.invest(
+                    Donation(full_amount=30), invest_session
+                ),
+            )
+
+        async with TestingSessionLocal() as session:
+            await order_book.flush(session)
+            project = await session.get(CharityProject, project.id)
+            assert (project.invested_amount, project.description) == (
+                30, 'new'
+            ), (
+                'Пожертвование, распределённое книгой заявок во время '
+                'изменения проекта, не должно теряться.'
+            )
+            assert await order_book.check_consistency(session) == [], (
+                'После изменения проекта книга заявок должна совпадать с БД.'
+            )
+    finally:
+        await allocation_queue.stop()
+        await order_book.stop(TestingSessionLocal)
+
+
+async def test_order_book_consistency_checks_ledger(mixer):
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='unbalanced',
+        description='unbalanced',
+        full_amount=100,
+        invested_amount=100,
+        fully_invested=True,
+    )
+    try:
+        async with TestingSessionLocal() as session:
+            await order_book.load(session)
+            problems = await order_book.check_consistency(session)
+    finally:
+        await order_book.stop(TestingSessionLocal)
+    assert problems == [
+        'charityproject 1: invested_amount 100, по журналу переводов 0'
+    ], (
+        'Сверка книги заявок должна сообщать о строках, у которых '
+        '`invested_amount` не совпадает с суммой переводов в журнале.'
+    )
+
+
+@pytest.mark.parametrize('allocation_engine', ('orm', 'sql'))
+def test_open_pool_totals(superuser_client, monkeypatch, allocation_engine):
+    monkeypatch.setattr(
+        'app.core.config.settings.allocation_engine', allocation_engine
+    )
+    app.dependency_overrides[current_user] = lambda: superuser
+    superuser_client.post(DONATION_URL, json={'full_amount': 100})
+    superuser_client.post(DONATION_URL + 'batch', json=[
+        {'full_amount': 250}, {'full_amount': 50},
+    ])
+    superuser_client.post(PROJECTS_URL, json={
+        'name': 'first', 'description': 'first', 'full_amount': 300,
+    })
+    second = superuser_client.post(PROJECTS_URL, json={
+        'name': 'second', 'description': 'second', 'full_amount': 500,
+    }).json()
+    superuser_client.post(PROJECTS_URL, json={
+        'name': 'third', 'description': 'third', 'full_amount': 200,
+    })
+    superuser_client.patch(
+        f'{PROJECTS_URL}{second["id"]}', json={'full_amount': 600}
+    )
+    third = superuser_client.get(PROJECTS_URL).json()[-1]
+    superuser_client.delete(f'{PROJECTS_URL}{third["id"]}')
+    response = superuser_client.get('/open_pool/')
+    assert response.status_code == 200, (
+        'GET-запрос суперпользователя к эндпоинту `/open_pool/` '
+        'должен возвращать статус-код 200.'
+    )
+    assert response.json() == {
+        'projects_count': 1,
+        'projects_remaining': 500,
+        'donations_count': 0,
+        'donations_remaining': 0,
+    }, (
+        'Итоги открытой очереди должны совпадать с открытыми проектами '
+        'и пожертвованиями после создания, распределения, '
+        'изменения и удаления записей.'
+    )
+
+
+def test_open_pool_skips_empty_counterpart(superuser_client, monkeypatch):
+    app.dependency_overrides[current_user] = lambda: superuser
+    superuser_client.post(PROJECTS_URL, json={
+        'name': 'first', 'description': 'first', 'full_amount': 300,
+    })
+
+    def open_pool_query(*args, **kwargs):
+        raise AssertionError
+
+    monkeypatch.setattr(
+        donation_crud, 'get_invested_charity_projects', open_pool_query
+    )
+    response = superuser_client.post(PROJECTS_URL, json={
+        'name': 'second', 'description': 'second', 'full_amount': 500,
+    })
+    assert response.status_code == 200, (
+        'Если открытых пожертвований нет, создание проекта '
+        'не должно запрашивать открытую очередь.'
+    )
+
+
+async def open_pool_problems(session):
+    """Расхождения итогов открытой очереди или книги заявок с таблицами."""
+
+    if order_book.loaded:
+        return await order_book.check_consistency(session)
+
+    open_pool = await open_pool_crud.get(session)
+    totals = await open_pool_crud.calculate(session)
+    if {field: getattr(open_pool, field) for field in totals} != totals:
+        return [f'openpool: {open_pool}, по таблицам {totals}']
+    return []
+
+
+@pytest.mark.parametrize('allocation_engine', ('orm', 'sql', 'memory'))
+async def test_allocation_after_bulk_create(monkeypatch, allocation_engine):
+    monkeypatch.setattr(
+        'app.core.config.settings.allocation_engine', allocation_engine
+    )
+    try:
+        async with TestingSessionLocal() as session:
+            await open_pool_crud.recalculate(session)
+            await session.commit()
+            await donation_crud.bulk_create(
+                [Donation(full_amount=10) for _ in range(3)], session
+            )
+            [imported] = await charity_project_crud.bulk_create(
+                [CharityProject(name='bulk', description='bulk',
+                                full_amount=25)],
+                session
+            )
+            project = CharityProject(
+                name='open', description='open', full_amount=100
+            )
+            session.add(project)
+            await session.commit()
+            await donation_crud.invest(project, session)
+            problems = await open_pool_problems(session)
+    finally:
+        await order_book.stop(TestingSessionLocal)
+    assert (imported.invested_amount, imported.fully_invested) == (25, True), (
+        'Проекты пакетной вставки должны сразу получать средства '
+        'открытых пожертвований.'
+    )
+    assert project.invested_amount == 5, (
+        'Пожертвования пакетной вставки должны учитываться '
+        'при распределении средств по новым проектам.'
+    )
+    assert problems == [], (
+        'Пакетная вставка должна обновлять итоги открытой очереди.'
+    )
+
+
+@pytest.mark.parametrize('allocation_engine', ('orm', 'sql', 'memory'))
+async def test_allocation_after_bulk_update_and_delete(
+        monkeypatch, allocation_engine
+):
+    monkeypatch.setattr(
+        'app.core.config.settings.allocation_engine', allocation_engine
+    )
+    try:
+        async with TestingSessionLocal() as session:
+            await open_pool_crud.recalculate(session)
+            await session.commit()
+            donations = await donation_crud.bulk_create(
+                [Donation(full_amount=10) for _ in range(3)], session
+            )
+            await donation_crud.bulk_update(
+                [{'id': donations[0].id, 'full_amount': 40}], session
+            )
+            await donation_crud.bulk_delete([donations[1].id], session)
+            project = CharityProject(
+                name='open', description='open', full_amount=100
+            )
+            session.add(project)
+            await session.commit()
+            await donation_crud.invest(project, session)
+            problems = await open_pool_problems(session)
+    finally:
+        await order_book.stop(TestingSessionLocal)
+    assert project.invested_amount == 50, (
+        'Распределение должно учитывать пакетные обновление '
+        'и удаление пожертвований.'
+    )
+    assert problems == [], (
+        'Пакетные обновление и удаление должны пересчитывать '
+        'итоги открытой очереди.'
+    )
+
+
+@pytest.mark.parametrize('allocation_engine', ('orm', 'sql'))
+def test_investment_ledger(superuser_client, monkeypatch, allocation_engine):
+    monkeypatch.setattr(
+        'app.core.config.settings.allocation_engine', allocation_engine
+    )
+    app.dependency_overrides[current_user] = lambda: superuser
+    superuser_client.post(DONATION_URL, json={'full_amount': 100})
+    superuser_client.post(DONATION_URL + 'batch', json=[
+        {'full_amount': 250}, {'full_amount': 50},
+    ])
+    first = superuser_client.post(PROJECTS_URL, json={
+        'name': 'first', 'description': 'first', 'full_amount': 300,
+    }).json()
+    second = superuser_client.post(PROJECTS_URL, json={
+        'name': 'second', 'description': 'second', 'full_amount': 500,
+    }).json()
+    superuser_client.post(DONATION_URL + 'batch', json=[
+        {'full_amount': 300}, {'full_amount': 200},
+    ])
+    common_asser_msg = (
+        'Журнал переводов должен хранить каждую пару пожертвования '
+        'и проекта, между которыми распределены средства.'
+    )
+    for project, expected in (
+        (first, [(1, 100), (2, 200)]),
+        (second, [(2, 50), (3, 50), (4, 300), (5, 100)]),
+    ):
+        response = superuser_client.get(
+            f'{PROJECTS_URL}{project["id"]}/investments'
+        )
+        assert [
+            (item['donation_id'], item['amount']) for item in response.json()
+        ] == expected, common_asser_msg
+    response = superuser_client.get(DONATION_URL + 'my/investments')
+    assert [
+        (item['donation_id'], item['project_id'], item['amount'])
+        for item in response.json()
+    ] == [
+        (1, first['id'], 100), (2, first['id'], 200), (2, second['id'], 50),
+        (3, second['id'], 50), (4, second['id'], 300),
+        (5, second['id'], 100),
+    ], common_asser_msg
+
+
+def test_project_investments_not_found(superuser_client):
+    response = superuser_client.get(PROJECTS_URL + '100/investments')
+    assert response.status_code == 404, (
+        'Запрос журнала переводов несуществующего проекта '
+        'должен возвращать статус-код 404.'
+    )
+
+
+def test_deferred_donation_accepted(user_client, monkeypatch):
+    monkeypatch.setattr(
+        'app.core.config.settings.deferred_allocation', True
+    )
+    response = user_client.post(DONATION_URL, json={'full_amount': 100})
+    assert response.status_code == 202, (
+        'В режиме отложенного распределения POST-запрос к эндпоинту '
+        f'`{DONATION_URL}` должен возвращать статус-код 202.'
+    )
+    donation_id = response.json()['id']
+    status = user_client.get(f'{DONATION_URL}{donation_id}/status').json()
+    assert status['allocated'] is False, (
+        'До фонового прохода пожертвование должно считаться '
+        'нераспределённым.'
+    )
+    response = user_client.get(f'{DONATION_URL}{donation_id + 1}/status')
+    assert response.status_code == 404, (
+        'Запрос статуса несуществующего пожертвования '
+        'должен возвращать статус-код 404.'
+    )
+
+
+async def test_deferred_allocation_coalesces_pending(monkeypatch):
+    monkeypatch.setattr(
+        'app.core.config.settings.deferred_allocation', True
+    )
+    async with TestingSessionLocal() as session:
+        await donation_crud.invest(
+            CharityProject(name='open', description='open', full_amount=250),
+            session
+        )
+        for full_amount in (100, 100, 100):
+            await donation_crud.defer(
+                Donation(full_amount=full_amount), session
+            )
+
+    deferred_allocation.start(TestingSessionLocal, window=0.01)
+    try:
+        await asyncio.sleep(0.2)
+    finally:
+        await deferred_allocation.stop()
+
+    async with TestingSessionLocal() as session:
+        donations = await session.execute(
+            select(
+                Donation.invested_amount,
+                Donation.allocated_at.isnot(None),
+            ).order_by(Donation.id)
+        )
+        assert donations.all() == [
+            (100, True), (100, True), (50, True)
+        ], (
+            'Фоновый проход должен распределить все отложенные '
+            'пожертвования и отметить их распределёнными.'
+        )
+        open_pool = await open_pool_crud.get(session)
+        assert (
+            open_pool.projects_count, open_pool.donations_count,
+            open_pool.donations_remaining,
+        ) == (0, 1, 50), (
+            'Итоги открытой очереди должны учитывать '
+            'отложенные пожертвования.'
+        )
+
+
+async def test_open_pool_get_is_read_only(superuser_client, mixer):
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='open',
+        description='open',
+        full_amount=100,
+    )
+    statements = []
+
+    def collect(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', collect)
+    try:
+        response = superuser_client.get('/open_pool/')
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', collect)
+    assert response.json() == {
+        'projects_count': 1,
+        'projects_remaining': 100,
+        'donations_count': 0,
+        'donations_remaining': 0,
+    }, 'Без строки итогов они должны считаться по таблицам.'
+    assert not [
+        statement for statement in statements
+        if statement.split()[0] in ('INSERT', 'UPDATE', 'DELETE')
+    ], 'GET-запрос к эндпоинту `/open_pool/` не должен ничего записывать.'
+    async with TestingSessionLocal() as session:
+        assert await open_pool_crud.get(session) is None, (
+            'GET-запрос к эндпоинту `/open_pool/` не должен создавать '
+            'строку итогов.'
+        )
+
+
+def test_patch_pulls_waiting_donations(superuser_client, monkeypatch):
+    app.dependency_overrides[current_user] = lambda: superuser
+    project = superuser_client.post(PROJECTS_URL, json={
+        'name': 'first', 'description': 'first', 'full_amount': 100,
+    }).json()
+    monkeypatch.setattr(
+        'app.core.config.settings.deferred_allocation', True
+    )
+    superuser_client.post(DONATION_URL, json={'full_amount': 150})
+    response = superuser_client.patch(
+        f'{PROJECTS_URL}{project["id"]}', json={'full_amount': 200}
+    )
+    data = response.json()
+    assert (data['invested_amount'], data['fully_invested']) == (150, False), (
+        'После увеличения `full_amount` ожидающие пожертвования '
+        'должны сразу довкладываться в проект.'
+    )
+    donation = superuser_client.get(DONATION_URL).json()[0]
+    assert donation['fully_invested'], (
+        'Довложенное пожертвование должно быть закрыто.'
+    )
+    assert superuser_client.get('/open_pool/').json() == {
+        'projects_count': 1,
+        'projects_remaining': 50,
+        'donations_count': 0,
+        'donations_remaining': 0,
+    }, 'Итоги открытой очереди должны учитывать довложение.'
+
+
+def test_patch_full_amount_equal_invested_closes_project(
+        superuser_client, charity_project_little_invested
+):
+    response = superuser_client.patch(
+        f'{PROJECTS_URL}{charity_project_little_invested.id}',
+        json={'full_amount': 100}
+    )
+    data = response.json()
+    assert data['fully_invested'] and data['close_date'], (
+        'Если новая требуемая сумма равна уже внесённой, '
+        'проект должен быть закрыт.'
+    )
+
+
+@pytest.mark.parametrize('allocation_engine', ('orm', 'sql'))
+def test_change_feed(superuser_client, monkeypatch, allocation_engine):
+    monkeypatch.setattr(
+        'app.core.config.settings.allocation_engine', allocation_engine
+    )
+    app.dependency_overrides[current_user] = lambda: superuser
+    superuser_client.post(DONATION_URL, json={'full_amount': 100})
+    first = superuser_client.post(PROJECTS_URL, json={
+        'name': 'first', 'description': 'first', 'full_amount': 300,
+    }).json()
+    response = superuser_client.get(CHANGES_URL)
+    assert response.status_code == 200, (
+        'GET-запрос суперпользователя к эндпоинту `/changes/` '
+        'должен возвращать статус-код 200.'
+    )
+    changes = response.json()
+    assert (
+        len(changes['charity_projects']), len(changes['donations'])
+    ) == (1, 1), 'Без курсора лента изменений должна начинаться с начала.'
+
+    response = superuser_client.get(
+        CHANGES_URL, params={'since': changes['next_cursor']}
+    )
+    assert response.json()['charity_projects'] == [], (
+        'После курсора без новых изменений лента должна быть пустой.'
+    )
+
+    superuser_client.post(PROJECTS_URL, json={
+        'name': 'second', 'description': 'second', 'full_amount': 100,
+    })
+    superuser_client.post(DONATION_URL, json={'full_amount': 250})
+    changes = superuser_client.get(
+        CHANGES_URL, params={'since': changes['next_cursor'], 'limit': 1}
+    ).json()
+    assert [
+        project['id'] for project in changes['charity_projects']
+    ] == [first['id']] and changes['has_more'], (
+        'Лента изменений должна отдавать проекты, изменённые '
+        'распределением, страницами в порядке изменений.'
+    )
+    assert changes['charity_projects'][0]['fully_invested'], (
+        'Лента изменений должна возвращать последнее состояние записи.'
+    )
+    assert [
+        donation['full_amount'] for donation in changes['donations']
+    ] == [250], 'Лента изменений должна отдавать новые пожертвования.'
+    changes = superuser_client.get(
+        CHANGES_URL, params={'since': changes['next_cursor']}
+    ).json()
+    assert [
+        project['name'] for project in changes['charity_projects']
+    ] == ['second'] and not changes['has_more'], (
+        'Следующая страница ленты должна продолжаться с места, '
+        'где закончилась предыдущая.'
+    )
+
+
+def test_change_feed_invalid_cursor(superuser_client):
+    response = superuser_client.get(CHANGES_URL, params={'since': 'abc'})
+    assert response.status_code == 400, (
+        'Некорректный курсор ленты изменений должен приводить '
+        'к статус-коду 400.'
+    )